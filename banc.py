@@ -0,0 +1,280 @@
+##############################################################################
+#                                                                            #
+#                   Projet Slitherlink - Banc d'essai du solveur             #
+#                                                                            #
+##############################################################################
+
+# Mesure le solveur sur un corpus fixe : les grilles du dossier "grilles" et
+# celles du dossier "banc", générées une fois pour toutes (CORPUS) et
+# versionnées avec le projet. Pour chaque grille sont relevés la durée, les
+# nœuds, les retours en arrière et la mémoire maximale, écrits en JSON. Les
+# résultats peuvent être comparés à ceux d'une mesure de référence :
+#
+#     python banc.py -o reference.json
+#     (modification du solveur)
+#     python banc.py -o resultats.json --reference reference.json --seuil 0.2
+#
+# La commande se termine avec le code 1 si une régression est constatée.
+
+
+import os
+import sys
+import json
+import time
+import platform
+import argparse
+import tracemalloc
+from moteur import Recherche, Statistiques, lit_grille, indices_grille
+from generateur import grille_aleatoire, texte_grille
+from lot import RESOLUE, SANS_SOLUTION, DELAI, liste_grilles
+
+
+DOSSIER_CORPUS = 'banc'
+
+# Grilles générées du corpus : (lignes, colonnes, densité des indices, graine)
+CORPUS = ([(5, 5, 0.5, graine) for graine in range(3)]
+          + [(7, 7, 0.35, graine) for graine in range(3)]
+          + [(10, 10, 0.5, graine) for graine in range(3)]
+          + [(10, 10, 0.35, graine) for graine in range(3)]
+          + [(15, 15, 0.7, graine) for graine in range(3)]
+          + [(15, 15, 0.5, graine) for graine in range(3)]
+          + [(20, 20, 0.5, graine) for graine in range(3)]
+          + [(30, 30, 0.7, graine) for graine in range(3)]
+          # Grilles où un seul ordre de départage s'enlise (voir RELANCES)
+          + [(10, 10, 0.3, graine) for graine in (2, 20, 26, 31, 36)])
+
+# Nombre maximal de nœuds par grille, au-delà le statut est DELAI
+NOEUDS_MAX = 200000
+
+# Augmentation relative tolérée avant de signaler une régression
+SEUIL = 0.2
+
+# Hausses considérées comme du bruit de mesure : 50 ms de durée, 64 Kio de
+# mémoire (caches de l'interpréteur)
+BRUIT = {'duree': 0.05, 'memoire': 65536}
+
+# Mesures comparées à la référence
+MESURES = ('duree', 'noeuds', 'retours', 'memoire')
+
+
+def nom_grille(lignes, colonnes, densite, graine):
+    """
+    Retourne le nom du fichier d'une grille générée du corpus
+
+    :param lignes: int
+    :param colonnes: int
+    :param densite: float
+    :param graine: int
+    :return value: str
+
+    >>> nom_grille(10, 10, 0.35, 2)
+    '10x10-d35-g2.txt'
+    """
+    return '%dx%d-d%02d-g%d.txt' % (lignes, colonnes, round(densite * 100),
+                                    graine)
+
+
+def genere_corpus(dossier=DOSSIER_CORPUS):
+    """
+    Écrit dans dossier les grilles générées de CORPUS. Le résultat ne dépend
+    que de CORPUS et du générateur : à ne refaire que si l'un d'eux change,
+    les mesures précédentes n'étant alors plus comparables
+
+    :param dossier: str
+    """
+    os.makedirs(dossier, exist_ok=True)
+    for lignes, colonnes, densite, graine in CORPUS:
+        chemin = os.path.join(dossier,
+                              nom_grille(lignes, colonnes, densite, graine))
+        with open(chemin, 'w') as f:
+            f.write(texte_grille(grille_aleatoire(lignes, colonnes, graine,
+                                                  densite)))
+
+
+def corpus(dossiers=('grilles', DOSSIER_CORPUS)):
+    """
+    Retourne la liste des couples (nom, indices) des grilles .txt des
+    dossiers, nom étant le chemin du fichier
+
+    :param dossiers: tuple
+    :return value: list
+    """
+    grilles = []
+    for dossier in dossiers:
+        for nom in liste_grilles(dossier):
+            chemin = os.path.join(dossier, nom)
+            with open(chemin) as f:
+                grilles.append((chemin, indices_grille(lit_grille(f)[0])))
+    return grilles
+
+
+def cherche(indices, noeuds_max):
+    """
+    Cherche une solution de la grille en s'arrêtant après noeuds_max nœuds.
+    Retourne le couple (statut, recherche)
+
+    :param indices: list
+    :param noeuds_max: int
+    :return value: tuple
+    """
+    recherche = Recherche(indices, noeuds_max=noeuds_max)
+    resultat = recherche.selectionne_sommet()
+    if resultat is None:
+        return DELAI, recherche
+    return (RESOLUE if resultat else SANS_SOLUTION), recherche
+
+
+def mesure_grille(indices, repetitions=3, noeuds_max=NOEUDS_MAX):
+    """
+    Mesure la recherche d'une solution de la grille. La durée est la plus
+    courte de repetitions recherches, la mémoire maximale (en octets) est
+    relevée par tracemalloc lors d'une recherche supplémentaire. Retourne
+    le dict des mesures, complété par la profondeur maximale et les
+    branches abandonnées par cause (voir moteur.Statistiques)
+
+    :param indices: list
+    :param repetitions: int
+    :param noeuds_max: int
+    :return value: dict
+
+    >>> mesures = mesure_grille([['2', '2'], ['2', '2']], 1)
+    >>> mesures['statut'], mesures['retours'] >= 0, mesures['memoire'] > 0
+    ('resolue', True, True)
+    """
+    duree = None
+    for _ in range(max(1, repetitions)):
+        debut = time.perf_counter()
+        statut, recherche = cherche(indices, noeuds_max)
+        fin = time.perf_counter() - debut
+        if duree is None or fin < duree:
+            duree = fin
+    tracemalloc.start()
+    try:
+        cherche(indices, noeuds_max)
+        memoire = tracemalloc.get_traced_memory()[1]
+    finally:
+        tracemalloc.stop()
+    statistiques = Statistiques(recherche)
+    return {'statut': statut, 'duree': duree, 'noeuds': statistiques.noeuds,
+            'retours': statistiques.retours, 'memoire': memoire,
+            'profondeur_max': statistiques.profondeur_max,
+            'elagages': statistiques.elagages}
+
+
+def lance_banc(grilles, repetitions=3, noeuds_max=NOEUDS_MAX,
+               affichage=sys.stdout):
+    """
+    Mesure chacune des grilles (liste de couples (nom, indices)). Retourne
+    le dict des résultats, prêt à être écrit en JSON
+
+    :param grilles: list
+    :param repetitions: int
+    :param noeuds_max: int
+    :param affichage: file
+    :return value: dict
+    """
+    resultats = {}
+    for nom, indices in grilles:
+        resultats[nom] = mesures = mesure_grille(indices, repetitions,
+                                                 noeuds_max)
+        if affichage is not None:
+            print(nom, mesures['statut'], round(mesures['duree'], 4),
+                  mesures['noeuds'], mesures['retours'], mesures['memoire'],
+                  file=affichage)
+    return {'python': platform.python_version(),
+            'machine': platform.machine(),
+            'date': time.strftime('%Y-%m-%d %H:%M:%S'),
+            'noeuds_max': noeuds_max,
+            'repetitions': repetitions,
+            'grilles': resultats}
+
+
+def compare(resultats, reference, seuil=SEUIL):
+    """
+    Compare les résultats de lance_banc à ceux d'une référence. Retourne la
+    liste des régressions : grille dont le statut a changé, ou dont une
+    mesure a augmenté de plus de seuil (en proportion). Les hausses plus
+    petites que BRUIT et les grilles absentes de la référence sont
+    ignorées
+
+    :param resultats: dict
+    :param reference: dict
+    :param seuil: float
+    :return value: list
+
+    >>> avant = {'grilles': {'a': {'statut': 'resolue', 'duree': 1.0,
+    ...                            'noeuds': 100, 'retours': 10,
+    ...                            'memoire': 1000}}}
+    >>> apres = {'grilles': {'a': dict(avant['grilles']['a'], noeuds=130)}}
+    >>> compare(apres, avant)
+    ['a : noeuds 100 -> 130 (+30 %)']
+    >>> compare(apres, avant, seuil=0.5)
+    []
+    """
+    regressions = []
+    anciens = reference['grilles']
+    for nom, mesures in sorted(resultats['grilles'].items()):
+        if nom not in anciens:
+            continue
+        ancien = anciens[nom]
+        if mesures['statut'] != ancien['statut']:
+            regressions.append('%s : statut %s -> %s'
+                               % (nom, ancien['statut'], mesures['statut']))
+            continue
+        for mesure in MESURES:
+            avant, apres = ancien[mesure], mesures[mesure]
+            if apres - avant <= BRUIT.get(mesure, 0):
+                continue
+            if apres > avant * (1 + seuil):
+                hausse = '+%d %%' % round(100 * (apres - avant) / avant) \
+                    if avant else 'nouveau'
+                if mesure == 'duree':
+                    avant, apres = round(avant, 4), round(apres, 4)
+                regressions.append('%s : %s %s -> %s (%s)'
+                                   % (nom, mesure, avant, apres, hausse))
+    return regressions
+
+
+def main(arguments=None):
+    """
+    Point d'entrée en ligne de commande. Retourne le code de sortie : 1 si
+    une régression est constatée, 0 sinon
+    """
+    analyseur = argparse.ArgumentParser(
+        description='Mesure les performances du solveur sur le corpus')
+    analyseur.add_argument('dossiers', nargs='*',
+                           default=['grilles', DOSSIER_CORPUS])
+    analyseur.add_argument('-o', '--sortie', default='banc.json',
+                           help='fichier JSON des résultats')
+    analyseur.add_argument('-r', '--reference',
+                           help='résultats JSON auxquels se comparer')
+    analyseur.add_argument('-s', '--seuil', type=float, default=SEUIL,
+                           help='augmentation relative tolérée (0.2 pour '
+                                '20 %%)')
+    analyseur.add_argument('-n', '--repetitions', type=int, default=3,
+                           help='nombre de mesures de la durée par grille')
+    analyseur.add_argument('--noeuds-max', type=int, default=NOEUDS_MAX,
+                           help='nombre de nœuds au-delà duquel une grille '
+                                'est abandonnée')
+    analyseur.add_argument('--genere', action='store_true',
+                           help='régénère les grilles du corpus et s\'arrête')
+    options = analyseur.parse_args(arguments)
+    if options.genere:
+        genere_corpus()
+        return 0
+    resultats = lance_banc(corpus(options.dossiers), options.repetitions,
+                           options.noeuds_max)
+    with open(options.sortie, 'w') as f:
+        json.dump(resultats, f, indent=1, sort_keys=True)
+    if options.reference is None:
+        return 0
+    with open(options.reference) as f:
+        regressions = compare(resultats, json.load(f), options.seuil)
+    for regression in regressions:
+        print('Régression', regression)
+    print(len(regressions), 'régression(s)')
+    return 1 if regressions else 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
@@ -0,0 +1,226 @@
+##############################################################################
+#                                                                            #
+#                   Projet Slitherlink - Cache des solutions                 #
+#                                                                            #
+##############################################################################
+
+# Les solutions déjà calculées sont conservées dans une base SQLite, indexées
+# par une empreinte des indices de la grille : rouvrir une grille déjà résolue
+# ne relance pas la recherche. Le nombre de grilles conservées est borné, les
+# moins récemment utilisées étant supprimées en premier. Le dossier de la base
+# est ~/.cache/slitherlink, ou celui de la variable d'environnement
+# SLITHERLINK_CACHE.
+
+
+import os
+import json
+import sqlite3
+import hashlib
+from doctest import testmod
+from moteur import Etat
+
+
+# Nombre maximal de grilles conservées
+TAILLE_CACHE = 1000
+
+FICHIER_CACHE = 'solutions.sqlite'
+
+
+def repertoire_cache():
+    """
+    Retourne le dossier par défaut de la base des solutions
+
+    :return value: str
+    """
+    repertoire = os.environ.get('SLITHERLINK_CACHE')
+    if repertoire:
+        return repertoire
+    return os.path.join(os.path.expanduser('~'), '.cache', 'slitherlink')
+
+
+def cle_grille(indices):
+    """
+    Retourne l'empreinte (SHA-256) de la grille normalisée : une ligne par
+    rangée, '_' pour une case sans indice. Deux grilles ont la même clé si
+    et seulement si elles ont les mêmes indices aux mêmes places
+
+    :param indices: list
+    :return value: str
+
+    >>> cle_grille([['2', None]]) == cle_grille([[2, None]])
+    True
+    >>> cle_grille([['2', None]]) == cle_grille([['2'], [None]])
+    False
+    """
+    texte = '\n'.join(''.join('_' if indice is None else str(indice)
+                              for indice in ligne) for ligne in indices)
+    return hashlib.sha256(texte.encode()).hexdigest()
+
+
+def compatible(solution, etat):
+    """
+    Indique si la boucle solution respecte les segments tracés et interdits
+    de etat
+
+    :param solution: dict
+    :param etat: dict
+    :return value: bool
+
+    >>> compatible({((0, 0), (0, 1)): 1}, {((0, 0), (0, 1)): 1})
+    True
+    >>> compatible({((0, 0), (0, 1)): 1}, {((0, 0), (0, 1)): -1})
+    False
+    """
+    for segment, valeur in etat.items():
+        if valeur == 1 and segment not in solution:
+            return False
+        if valeur == -1 and segment in solution:
+            return False
+    return True
+
+
+class CacheSolutions:
+    """
+    Base des solutions connues, indexée par cle_grille. Chaque entrée
+    contient la boucle (ou l'absence de solution) et les statistiques de la
+    recherche qui l'a trouvée. Au-delà de taille entrées, les moins
+    récemment lues ou écrites sont supprimées. Plusieurs processus peuvent
+    utiliser la même base
+
+    >>> import tempfile
+    >>> with tempfile.TemporaryDirectory() as repertoire:
+    ...     cache = CacheSolutions(repertoire, taille=2)
+    ...     cache.cherche([['2', '2'], ['2', '2']]) is None
+    ...     cache.enregistre([['3', '0']], None, {'noeuds': 1})
+    ...     cache.cherche([['3', '0']])
+    ...     cache.enregistre([['1']], {((0, 0), (0, 1)): 1}, {})
+    ...     cache.cherche([['1']])[0]
+    ...     cache.enregistre([['0']], None, {})
+    ...     len(cache), cache.cherche([['3', '0']])
+    ...     cache.enregistre([['2']], None, {}, {((0, 0), (0, 1)): -1})
+    ...     cache.cherche([['2']]) is None
+    ...     cache.ferme()
+    ...     cache.enregistre([['1']], None, {})
+    ...     cache.cherche([['1']]) is None
+    True
+    (None, {'noeuds': 1})
+    {((0, 0), (0, 1)): 1}
+    (2, None)
+    True
+    True
+    """
+
+    def __init__(self, repertoire=None, taille=TAILLE_CACHE):
+        if repertoire is None:
+            repertoire = repertoire_cache()
+        os.makedirs(repertoire, exist_ok=True)
+        self.taille = taille
+        self.connexion = sqlite3.connect(
+            os.path.join(repertoire, FICHIER_CACHE), timeout=30)
+        with self.connexion:
+            self.connexion.execute(
+                'CREATE TABLE IF NOT EXISTS solutions ('
+                'cle TEXT PRIMARY KEY, solution TEXT, statistiques TEXT, '
+                'utilisation INTEGER)')
+            self.connexion.execute(
+                'CREATE INDEX IF NOT EXISTS ordre ON solutions (utilisation)')
+
+    def __len__(self):
+        return self.connexion.execute(
+            'SELECT COUNT(*) FROM solutions').fetchone()[0]
+
+    def ferme(self):
+        """
+        Ferme la base
+        """
+        self.connexion.close()
+
+    def cherche(self, indices, etat=None):
+        """
+        Retourne le couple (solution, statistiques) enregistré pour la
+        grille, solution étant un Etat ne contenant que la boucle, ou None
+        si la grille n'a pas de solution. Retourne None si la grille est
+        inconnue, si sa solution ne respecte pas etat (une partie
+        commencée) ou si la base est inaccessible (verrouillée, en lecture
+        seule...)
+
+        :param indices: list
+        :param etat: dict
+        :return value: tuple
+        """
+        cle = cle_grille(indices)
+        try:
+            with self.connexion:
+                ligne = self.connexion.execute(
+                    'SELECT solution, statistiques FROM solutions '
+                    'WHERE cle = ?', (cle,)).fetchone()
+                if ligne is None:
+                    return None
+                self.connexion.execute(
+                    'UPDATE solutions SET utilisation = (SELECT '
+                    'MAX(utilisation) FROM solutions) + 1 WHERE cle = ?',
+                    (cle,))
+        except sqlite3.Error:
+            return None
+        solution = None
+        if ligne[0] is not None:
+            solution = Etat({((a, b), (c, d)): 1
+                             for a, b, c, d in json.loads(ligne[0])})
+            if etat and not compatible(solution, etat):
+                return None
+        return solution, json.loads(ligne[1])
+
+    def enregistre(self, indices, solution, statistiques, etat=None):
+        """
+        Enregistre la solution de la grille (None si elle n'en a pas) avec
+        les statistiques de la recherche, puis supprime les entrées les
+        moins récemment utilisées au-delà de la taille du cache. etat est
+        l'état de départ de la recherche : une absence de solution trouvée
+        depuis une partie commencée n'est pas enregistrée, la grille
+        pouvant en avoir une. Rien n'est enregistré si la base est
+        inaccessible (verrouillée, disque plein...)
+
+        :param indices: list
+        :param solution: dict
+        :param statistiques: dict
+        :param etat: dict
+        """
+        if solution is None and etat:
+            return
+        if solution is not None:
+            solution = json.dumps(sorted(
+                [a, b, c, d] for ((a, b), (c, d)), valeur in solution.items()
+                if valeur == 1))
+        try:
+            with self.connexion:
+                self.connexion.execute(
+                    'INSERT OR REPLACE INTO solutions VALUES (?, ?, ?, '
+                    '(SELECT IFNULL(MAX(utilisation), 0) + 1 '
+                    'FROM solutions))',
+                    (cle_grille(indices), solution, json.dumps(statistiques)))
+                self.connexion.execute(
+                    'DELETE FROM solutions WHERE cle IN (SELECT cle FROM '
+                    'solutions ORDER BY utilisation DESC LIMIT -1 OFFSET ?)',
+                    (self.taille,))
+        except sqlite3.Error:
+            pass
+
+
+def ouvre_cache(repertoire=None, taille=TAILLE_CACHE):
+    """
+    Ouvre la base des solutions, ou retourne None si elle est inaccessible
+    (dossier en lecture seule, base corrompue...) : le jeu fonctionne alors
+    sans cache
+
+    :param repertoire: str
+    :param taille: int
+    :return value: CacheSolutions
+    """
+    try:
+        return CacheSolutions(repertoire, taille)
+    except (OSError, sqlite3.Error):
+        return None
+
+
+if __name__ == '__main__':
+    testmod()
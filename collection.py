@@ -0,0 +1,255 @@
+##############################################################################
+#                                                                            #
+#                   Projet Slitherlink - Collections de grilles              #
+#                                                                            #
+##############################################################################
+
+# Une collection range un grand nombre de grilles dans un seul fichier, au
+# format texte du dossier "grilles", les unes à la suite des autres. Un
+# fichier d'index (même nom suivi de .idx) donne, pour chaque grille, sa
+# position et sa longueur sur 12 octets : la grille n est lue directement,
+# sans lire celles qui la précèdent. Les deux fichiers sont lus par mmap.
+# Les ajouts se font à la fin, sous un verrou exclusif, ce qui donne à
+# chaque grille un numéro unique même avec plusieurs processus. Une grille
+# écrite mais pas encore indexée (arrêt brutal) est simplement ignorée.
+# Utilisation :
+#
+#     python collection.py importe grilles grilles.slk
+#     python collection.py affiche grilles.slk 500000
+#     python collection.py compte grilles.slk
+
+
+import os
+import sys
+import mmap
+import struct
+import argparse
+from doctest import testmod
+from moteur import lit_grille, indices_grille
+
+try:
+    import fcntl
+except ImportError:  # Windows : pas de verrou entre processus
+    fcntl = None
+
+
+MAGIQUE_DONNEES = b'SLKCOL01'
+MAGIQUE_INDEX = b'SLKIDX01'
+
+# Entrée de l'index : position (8 octets) et longueur (4 octets) de la grille
+ENTREE = struct.Struct('<QI')
+
+
+class Collection:
+    """
+    Collection de grilles numérotées à partir de 1, créée si le fichier
+    chemin n'existe pas. Une grille est la liste de ses lignes, comme la
+    grille retournée par moteur.lit_grille
+
+    >>> import tempfile
+    >>> with tempfile.TemporaryDirectory() as dossier:
+    ...     collection = Collection(os.path.join(dossier, 'essai.slk'))
+    ...     collection.ajoute(['2_\\n', '_3\\n']), collection.ajoute('0\\n')
+    ...     len(collection), collection[1], collection.indices(2)
+    ...     collection.ferme()
+    (1, 2)
+    (2, ['2_\\n', '_3\\n'], [['0']])
+    """
+
+    def __init__(self, chemin):
+        self.chemin = chemin
+        self.donnees = open(chemin, 'a+b')
+        self.index = open(chemin + '.idx', 'a+b')
+        with self.verrou():
+            for fichier, magique in ((self.donnees, MAGIQUE_DONNEES),
+                                     (self.index, MAGIQUE_INDEX)):
+                fichier.seek(0, os.SEEK_END)
+                if fichier.tell() == 0:
+                    fichier.write(magique)
+                    fichier.flush()
+                fichier.seek(0)
+                if fichier.read(len(magique)) != magique:
+                    raise ValueError(chemin + " n'est pas une collection de "
+                                     "grilles")
+        self.carte_donnees = self.carte_index = None
+
+    def verrou(self):
+        """
+        Retourne un gestionnaire de contexte qui réserve la collection aux
+        ajouts du processus courant
+        """
+        return Verrou(self.index)
+
+    def cartes(self):
+        """
+        Met à jour (si les fichiers ont grandi) et retourne les projections
+        mmap des données et de l'index
+        """
+        taille = os.fstat(self.index.fileno()).st_size
+        if self.carte_index is None or len(self.carte_index) != taille:
+            self.fermer_cartes()
+            self.carte_index = mmap.mmap(self.index.fileno(), 0,
+                                         access=mmap.ACCESS_READ)
+            self.carte_donnees = mmap.mmap(self.donnees.fileno(), 0,
+                                           access=mmap.ACCESS_READ)
+        return self.carte_donnees, self.carte_index
+
+    def fermer_cartes(self):
+        """
+        Ferme les projections mmap
+        """
+        for carte in (self.carte_donnees, self.carte_index):
+            if carte is not None:
+                carte.close()
+        self.carte_donnees = self.carte_index = None
+
+    def __len__(self):
+        taille = os.fstat(self.index.fileno()).st_size
+        return (taille - len(MAGIQUE_INDEX)) // ENTREE.size
+
+    def __getitem__(self, numero):
+        return self.texte(numero).splitlines(keepends=True)
+
+    def __iter__(self):
+        for numero in range(1, len(self) + 1):
+            yield self[numero]
+
+    def texte(self, numero):
+        """
+        Retourne le texte de la grille numero. Lève IndexError si elle
+        n'existe pas
+
+        :param numero: int
+        :return value: str
+        """
+        donnees, index = self.cartes()
+        if not 1 <= numero <= (len(index) - len(MAGIQUE_INDEX)) // ENTREE.size:
+            raise IndexError('pas de grille ' + str(numero))
+        position, longueur = ENTREE.unpack_from(
+            index, len(MAGIQUE_INDEX) + (numero - 1) * ENTREE.size)
+        return donnees[position:position + longueur].decode('ascii')
+
+    def indices(self, numero):
+        """
+        Retourne les indices de la grille numero (voir moteur.indices_grille)
+
+        :param numero: int
+        :return value: list
+        """
+        return indices_grille(self[numero])
+
+    def ajoute(self, grille):
+        """
+        Ajoute à la fin de la collection la grille (liste de lignes ou
+        texte) et retourne son numéro
+
+        :param grille: list
+        :return value: int
+        """
+        if not isinstance(grille, str):
+            grille = ''.join(grille)
+        texte = grille.encode('ascii')
+        with self.verrou():
+            self.donnees.seek(0, os.SEEK_END)
+            position = self.donnees.tell()
+            self.donnees.write(texte)
+            self.donnees.flush()
+            self.index.seek(0, os.SEEK_END)
+            numero = (self.index.tell() - len(MAGIQUE_INDEX)) \
+                // ENTREE.size + 1
+            self.index.write(ENTREE.pack(position, len(texte)))
+            self.index.flush()
+        return numero
+
+    def ferme(self):
+        """
+        Ferme la collection
+        """
+        self.fermer_cartes()
+        self.donnees.close()
+        self.index.close()
+
+
+class Verrou:
+    """
+    Verrou exclusif (fcntl.flock) sur un fichier ouvert, à utiliser avec
+    with. Sans fcntl (Windows), il ne protège pas des autres processus
+    """
+
+    def __init__(self, fichier):
+        self.fichier = fichier
+
+    def __enter__(self):
+        if fcntl is not None:
+            fcntl.flock(self.fichier.fileno(), fcntl.LOCK_EX)
+        return self
+
+    def __exit__(self, *exception):
+        if fcntl is not None:
+            fcntl.flock(self.fichier.fileno(), fcntl.LOCK_UN)
+
+
+def importe_dossier(dossier, chemin):
+    """
+    Ajoute à la collection chemin les grilles .txt de dossier, dans l'ordre
+    de leur nom (les éventuelles parties en cours sont ignorées). Retourne
+    la liste des couples (nom, numéro)
+
+    :param dossier: str
+    :param chemin: str
+    :return value: list
+    """
+    collection = Collection(chemin)
+    numeros = []
+    try:
+        for nom in sorted(os.listdir(dossier)):
+            if nom.endswith('.txt'):
+                with open(os.path.join(dossier, nom)) as f:
+                    grille = lit_grille(f)[0]
+                numeros.append((nom, collection.ajoute(grille)))
+    finally:
+        collection.ferme()
+    return numeros
+
+
+def main(arguments=None):
+    """
+    Point d'entrée en ligne de commande
+    """
+    analyseur = argparse.ArgumentParser(
+        description='Gère les collections de grilles')
+    commandes = analyseur.add_subparsers(dest='commande', required=True)
+    importe = commandes.add_parser('importe', help='ajoute les grilles .txt '
+                                                   'd\'un dossier')
+    importe.add_argument('dossier')
+    importe.add_argument('collection')
+    affiche = commandes.add_parser('affiche', help='affiche une grille')
+    affiche.add_argument('collection')
+    affiche.add_argument('numero', type=int)
+    compte = commandes.add_parser('compte', help='nombre de grilles')
+    compte.add_argument('collection')
+    options = analyseur.parse_args(arguments)
+    if options.commande == 'importe':
+        for nom, numero in importe_dossier(options.dossier,
+                                           options.collection):
+            print(numero, nom)
+        return 0
+    collection = Collection(options.collection)
+    try:
+        if options.commande == 'compte':
+            print(len(collection))
+        else:
+            try:
+                sys.stdout.write(collection.texte(options.numero))
+            except IndexError as erreur:
+                print(erreur, file=sys.stderr)
+                return 1
+    finally:
+        collection.ferme()
+    return 0
+
+
+if __name__ == '__main__':
+    if len(sys.argv) > 1:
+        sys.exit(main())
+    testmod()
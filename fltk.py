@@ -31,6 +31,9 @@ __all__ = [
     # effacer
     'efface_tout',
     'efface',
+    # modifier
+    'modifie',
+    'deplace',
     # utilitaires
     'attente',
     'capture_ecran',
@@ -84,8 +87,10 @@ class CustomCanvas:
         self.canvas.pack()
         self.canvas.focus_set()
 
-        # binding events
+        # binding events ; ev_signal is written each time an event is queued,
+        # which wakes up wait()
         self.ev_queue = deque()
+        self.ev_signal = tk.BooleanVar(self.root, False)
         self.pressed_keys = set()
         self.events = CustomCanvas._default_ev if events is None else events
         self.bind_events()
@@ -107,6 +112,33 @@ class CustomCanvas:
         sleep(max(0., self.interval - (t - self.last_update)))
         self.last_update = time()
 
+    def wait(self, timeout=None):
+        """
+        Runs Tk's event loop, without using the CPU, until an event is
+        queued or ``timeout`` seconds have elapsed (no limit if None).
+        Returns immediately if an event is already queued.
+        """
+        if self.ev_queue:
+            return
+        alarm = None
+        if timeout is not None:
+            alarm = self.root.after(max(0, int(timeout * 1000)),
+                                    self.ev_signal.set, False)
+        self.root.wait_variable(self.ev_signal)
+        if alarm is not None:
+            self.root.after_cancel(alarm)
+        self.last_update = time()
+
+    def sleep(self, duration):
+        """
+        Runs Tk's event loop, without using the CPU, for ``duration``
+        seconds. Events are queued but do not end the wait.
+        """
+        done = tk.BooleanVar(self.root, False)
+        self.root.after(max(0, int(duration * 1000)), done.set, True)
+        self.root.wait_variable(done)
+        self.last_update = time()
+
     def bind_events(self):
         self.root.protocol("WM_DELETE_WINDOW", self.event_quit)
         self.canvas.bind('<KeyPress>', self.register_key)
@@ -123,12 +155,14 @@ class CustomCanvas:
 
     def event_quit(self):
         self.ev_queue.append(("Quitte", ""))
+        self.ev_signal.set(True)
 
     def bind_event(self, name):
         e_type = CustomCanvas._ev_mapping.get(name, name)
 
         def handler(event, _name=name):
             self.ev_queue.append((_name, event))
+            self.ev_signal.set(True)
         self.canvas.bind(e_type, handler, '+')
 
     def unbind_event(self, name):
@@ -449,15 +483,48 @@ def efface(objet):
     __canevas.canvas.delete(objet)
 
 
+#############################################################################
+# Modifier
+#############################################################################
+
+def modifie(objet, **options):
+    """
+    Modifie les options tkinter (``state``, ``text``, ``fill``...) de
+    ``objet`` sans le recréer.
+
+    :param: objet ou étiquette d'objet à modifier
+    :type: ``int`` ou ``str``
+    :param options: options de ``Canvas.itemconfigure``
+    """
+    __canevas.canvas.itemconfigure(objet, **options)
+
+
+def deplace(objet, *coordonnees):
+    """
+    Donne à ``objet`` de nouvelles coordonnées (``ax, ay, bx, by`` pour un
+    segment) sans le recréer.
+
+    :param: objet ou étiquette d'objet à déplacer
+    :type: ``int`` ou ``str``
+    :param coordonnees: nouvelles coordonnées des points de l'objet
+    """
+    __canevas.canvas.coords(objet, *coordonnees)
+
+
 #############################################################################
 # Utilitaires
 #############################################################################
 
 
 def attente(temps):
-    start = time()
-    while time() - start < temps:
-        mise_a_jour()
+    """
+    Attend ``temps`` secondes en laissant la fenêtre se mettre à jour, sans
+    occuper le processeur.
+    """
+    if __canevas is None:
+        raise FenetreNonCree(
+            "La fenêtre n'a pas été crée avec la fonction \"cree_fenetre\".")
+    __canevas.sleep(temps)
 
 
 def capture_ecran(file):
@@ -500,14 +567,23 @@ def donne_ev():
         return __canevas.ev_queue.popleft()
 
 
-def attend_ev():
+def attend_ev(delai=None):
     """Attend qu'un événement ait lieu et renvoie le premier événement qui
-    se produit."""
+    se produit. La fenêtre reste à jour mais l'attente n'occupe pas le
+    processeur. Avec ``delai`` (en secondes), renvoie ``None`` si aucun
+    événement n'a eu lieu dans ce délai."""
+    fin = None if delai is None else time() + delai
     while True:
         ev = donne_ev()
         if ev is not None:
             return ev
-        mise_a_jour()
+        if fin is None:
+            __canevas.wait()
+        else:
+            reste = fin - time()
+            if reste <= 0:
+                return None
+            __canevas.wait(reste)
 
 
 def attend_clic_gauche():
@@ -518,7 +594,8 @@ def attend_clic_gauche():
         ev = donne_ev()
         if ev is not None and type_ev(ev) == 'ClicGauche':
             return abscisse(ev), ordonnee(ev)
-        mise_a_jour()
+        if ev is None:
+            __canevas.wait()
 
 
 def attend_fermeture():
@@ -529,7 +606,8 @@ def attend_fermeture():
         if ev is not None and type_ev(ev) == 'Quitte':
             ferme_fenetre()
             return
-        mise_a_jour()
+        if ev is None:
+            __canevas.wait()
 
 
 def type_ev(ev):
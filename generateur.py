@@ -0,0 +1,333 @@
+##############################################################################
+#                                                                            #
+#                   Projet Slitherlink - Génération de grilles               #
+#                                                                            #
+##############################################################################
+
+# Une boucle aléatoire est obtenue comme le bord d'une région de cases que
+# l'on fait grossir case par case, sans jamais y créer de trou ni de contact
+# par un coin : son bord reste alors une seule boucle. Les indices de la
+# grille sont les nombres de côtés de chaque case qui appartiennent au bord.
+# Pour une grille à solution unique, les indices sont ensuite retirés dans un
+# ordre aléatoire tant que la solution reste unique. Utilisation :
+#
+#     python generateur.py -n 100 -t 10x10 -g 42 -o grilles
+#     python generateur.py -n 100000 -t 10x10 -c grilles/collection.slk
+
+
+import os
+import sys
+import time
+import random
+import argparse
+from moteur import Etat, Recherche
+from collection import Collection
+
+# Nombre de nœuds au-delà duquel la vérification d'unicité renonce : l'indice
+# qu'on voulait retirer est alors gardé. Plus grand, les grilles ont un peu
+# moins d'indices mais sont plus longues à produire
+NOEUDS_UNICITE = 30
+
+
+# Voisins d'une case dans l'ordre du tour, en commençant par le haut
+TOUR = ((-1, 0), (-1, 1), (0, 1), (1, 1), (1, 0), (1, -1), (0, -1), (-1, -1))
+
+
+def ajout_possible(region, hauteur, largeur, i, j):
+    """
+    Indique si la case (i, j), voisine de region, peut y être ajoutée sans
+    que le bord de la région cesse d'être une seule boucle : les cases de
+    la région qui l'entourent doivent former un seul arc du tour, et aucun
+    carré de quatre cases ne doit avoir ses cases de la région sur une seule
+    diagonale
+
+    :param region: set
+    :param hauteur: int
+    :param largeur: int
+    :param i: int
+    :param j: int
+    :return value: bool
+
+    >>> ajout_possible({(0, 0), (1, 0), (1, 1)}, 2, 2, 0, 1)
+    True
+    >>> region = {(0, 0), (0, 2), (1, 0), (1, 2), (2, 0), (2, 1), (2, 2)}
+    >>> ajout_possible(region, 3, 3, 0, 1)
+    False
+    """
+    dedans = [(i + di, j + dj) in region for di, dj in TOUR]
+    if sum(dedans[k] != dedans[k - 1] for k in range(8)) != 2:
+        return False
+    for k in range(0, 8, 2):
+        # Coin k + 1 entre les voisins k et k + 2 du tour
+        if dedans[k + 1] and not dedans[k] and not dedans[(k + 2) % 8]:
+            return False
+    return True
+
+
+def boucle_aleatoire(hauteur, largeur, generateur, remplissage=None):
+    """
+    Retourne une région aléatoire de cases (ensemble de couples (i, j)) dont
+    le bord est une seule boucle. Elle grossit à partir d'une case jusqu'à
+    couvrir la proportion remplissage de la grille (tirée entre 0,4 et 0,7
+    par défaut) ou jusqu'à ce qu'aucune case ne puisse plus être ajoutée
+
+    :param hauteur: int
+    :param largeur: int
+    :param generateur: random.Random
+    :param remplissage: float
+    :return value: set
+
+    >>> len(boucle_aleatoire(3, 3, random.Random(0), 1))
+    9
+    """
+    if remplissage is None:
+        remplissage = generateur.uniform(0.4, 0.7)
+    cible = max(1, round(remplissage * hauteur * largeur))
+    depart = (generateur.randrange(hauteur), generateur.randrange(largeur))
+    region = {depart}
+    bordure = set()
+    nouvelles = [depart]
+    while len(region) < cible:
+        for i, j in nouvelles:
+            for di, dj in TOUR[::2]:
+                case = (i + di, j + dj)
+                if 0 <= case[0] < hauteur and 0 <= case[1] < largeur \
+                        and case not in region:
+                    bordure.add(case)
+        nouvelles = []
+        candidates = sorted(bordure)
+        generateur.shuffle(candidates)
+        for case in candidates:
+            if ajout_possible(region, hauteur, largeur, *case):
+                region.add(case)
+                bordure.discard(case)
+                nouvelles.append(case)
+                break
+        if not nouvelles:
+            break
+    return region
+
+
+def indices_region(region, hauteur, largeur):
+    """
+    Retourne les indices complets de la grille dont la solution est le bord
+    de region : pour chaque case, le nombre de ses côtés qui séparent une
+    case de la région d'une case hors de la région (ou du bord de la grille)
+
+    :param region: set
+    :param hauteur: int
+    :param largeur: int
+    :return value: list
+
+    >>> indices_region({(0, 0)}, 1, 2)
+    [['4', '1']]
+    """
+    return [[str(sum(((i, j) in region) != ((i + di, j + dj) in region)
+                     for di, dj in TOUR[::2]))
+             for j in range(largeur)] for i in range(hauteur)]
+
+
+def solution_region(region):
+    """
+    Retourne l'etat dont les segments tracés forment le bord de region
+
+    :param region: set
+    :return value: Etat
+
+    >>> len(solution_region({(0, 0), (0, 1)}))
+    6
+    """
+    etat = Etat()
+    for i, j in region:
+        cotes = (((i, j), (i, j + 1)), ((i + 1, j), (i + 1, j + 1)),
+                 ((i, j), (i + 1, j)), ((i, j + 1), (i + 1, j + 1)))
+        for (di, dj), segment in zip(((-1, 0), (1, 0), (0, -1), (0, 1)),
+                                     cotes):
+            if (i + di, j + dj) not in region:
+                etat[segment] = 1
+    return etat
+
+
+def grille_aleatoire(hauteur, largeur, graine=None, densite=0.5):
+    """
+    Retourne les indices d'une grille aléatoire ayant au moins une
+    solution : chaque indice de la boucle aléatoire est gardé avec la
+    probabilité densite. La même graine donne toujours la même grille
+
+    :param hauteur: int
+    :param largeur: int
+    :param graine: int
+    :param densite: float
+    :return value: list
+
+    >>> grille_aleatoire(4, 5, 3) == grille_aleatoire(4, 5, 3)
+    True
+    >>> len(grille_aleatoire(4, 5, 3)), len(grille_aleatoire(4, 5, 3)[0])
+    (4, 5)
+    """
+    generateur = random.Random(graine)
+    region = boucle_aleatoire(hauteur, largeur, generateur)
+    return [[indice if generateur.random() < densite else None
+             for indice in ligne]
+            for ligne in indices_region(region, hauteur, largeur)]
+
+
+def est_unique(indices, noeuds_max=NOEUDS_UNICITE):
+    """
+    Indique si la grille a exactement une solution, en cherchant une
+    deuxième solution sur au plus noeuds_max nœuds (None pour ne pas
+    limiter la recherche). Retourne False si la recherche est abandonnée
+
+    :param indices: list
+    :param noeuds_max: int
+    :return value: bool
+
+    >>> est_unique([['2', '2'], ['2', '2']]), est_unique([[None, None]])
+    (True, False)
+    """
+    recherche = Recherche(indices, noeuds_max=noeuds_max)
+    nombre = 0
+    for _ in recherche.solutions():
+        nombre += 1
+        if nombre == 2:
+            return False
+    return nombre == 1 and not recherche.interrompue
+
+
+def retire_indices(indices, generateur, noeuds_max=NOEUDS_UNICITE):
+    """
+    Retire de indices (modifié), dans un ordre aléatoire, chaque indice dont
+    le retrait laisse une grille à solution unique selon est_unique, puis
+    retourne indices
+
+    :param indices: list
+    :param generateur: random.Random
+    :param noeuds_max: int
+    :return value: list
+
+    >>> indices = [['3', '3']]
+    >>> retire_indices(indices, random.Random(0)) in ([['3', None]],
+    ...                                               [[None, '3']])
+    True
+    """
+    cases = [(i, j) for i in range(len(indices))
+             for j in range(len(indices[i])) if indices[i][j] is not None]
+    generateur.shuffle(cases)
+    for i, j in cases:
+        indice, indices[i][j] = indices[i][j], None
+        if not est_unique(indices, noeuds_max):
+            indices[i][j] = indice
+    return indices
+
+
+def grille_unique(hauteur, largeur, graine=None, noeuds_max=NOEUDS_UNICITE):
+    """
+    Retourne les indices d'une grille aléatoire à solution unique : tous
+    les indices d'une boucle aléatoire, dont on retire ensuite ceux qui ne
+    sont pas nécessaires (retire_indices). La même graine donne toujours la
+    même grille
+
+    :param hauteur: int
+    :param largeur: int
+    :param graine: int
+    :param noeuds_max: int
+    :return value: list
+
+    >>> indices = grille_unique(5, 5, 1)
+    >>> indices == grille_unique(5, 5, 1), est_unique(indices, None)
+    (True, True)
+    """
+    generateur = random.Random(graine)
+    region = boucle_aleatoire(hauteur, largeur, generateur)
+    return retire_indices(indices_region(region, hauteur, largeur),
+                          generateur, noeuds_max)
+
+
+def numero_libre(dossier):
+    """
+    Retourne le numéro de la prochaine grille "grilleN.txt" de dossier : le
+    plus grand numéro existant plus un (1 si le dossier n'en contient pas)
+
+    :param dossier: str
+    :return value: int
+    """
+    numeros = [0]
+    for nom in os.listdir(dossier):
+        if nom.startswith('grille') and nom.endswith('.txt') and \
+                nom[6:-4].isdigit():
+            numeros.append(int(nom[6:-4]))
+    return max(numeros) + 1
+
+
+def texte_grille(indices):
+    """
+    Retourne la grille au format des fichiers du dossier "grilles" : une
+    ligne par rangée, '_' pour une case sans indice
+
+    :param indices: list
+    :return value: str
+
+    >>> texte_grille([['2', None], [None, '3']])
+    '2_\\n_3\\n'
+    """
+    return ''.join(''.join('_' if indice is None else indice
+                           for indice in ligne) + '\n'
+                   for ligne in indices)
+
+
+def main(arguments=None):
+    """
+    Point d'entrée en ligne de commande
+    """
+    analyseur = argparse.ArgumentParser(
+        description='Génère des grilles aléatoires à solution unique')
+    analyseur.add_argument('-n', '--nombre', type=int, default=1,
+                           help='nombre de grilles à générer')
+    analyseur.add_argument('-t', '--taille', default='10x10',
+                           help='dimensions des grilles (lignes x colonnes)')
+    analyseur.add_argument('-g', '--graine', type=int, default=None,
+                           help='graine de la première grille, les '
+                                'suivantes prenant les graines suivantes')
+    analyseur.add_argument('-o', '--sortie', default='grilles',
+                           help='dossier où écrire les grilles')
+    analyseur.add_argument('-c', '--collection',
+                           help='collection où ajouter les grilles, au lieu '
+                                'de fichiers du dossier de sortie')
+    analyseur.add_argument('--noeuds-max', type=int, default=NOEUDS_UNICITE,
+                           help='effort maximal de chaque vérification '
+                                'd\'unicité')
+    options = analyseur.parse_args(arguments)
+    hauteur, largeur = (int(nombre) for nombre in options.taille.split('x'))
+    graine = options.graine
+    if graine is None:
+        graine = random.randrange(1 << 32)
+    collection = None
+    if options.collection is not None:
+        collection = Collection(options.collection)
+    else:
+        os.makedirs(options.sortie, exist_ok=True)
+        numero = numero_libre(options.sortie)
+    debut = time.perf_counter()
+    try:
+        for k in range(options.nombre):
+            indices = grille_unique(hauteur, largeur, graine + k,
+                                    options.noeuds_max)
+            if collection is not None:
+                nom = 'grille ' + str(
+                    collection.ajoute(texte_grille(indices)))
+            else:
+                nom = 'grille' + str(numero + k) + '.txt'
+                with open(os.path.join(options.sortie, nom), 'w') as f:
+                    f.write(texte_grille(indices))
+            print(nom, 'graine', graine + k, 'indices',
+                  sum(indice is not None for ligne in indices
+                      for indice in ligne), file=sys.stderr)
+    finally:
+        if collection is not None:
+            collection.ferme()
+    duree = time.perf_counter() - debut
+    print(options.nombre, 'grilles en', round(duree, 1), 's', file=sys.stderr)
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,205 @@
+##############################################################################
+#                                                                            #
+#                   Projet Slitherlink - Résolution par lot                  #
+#                                                                            #
+##############################################################################
+
+# Résout sans affichage toutes les grilles .txt d'un dossier, réparties sur
+# plusieurs processus, et écrit pour chacune la solution, le temps de
+# résolution et un statut. Avec --cache, les grilles déjà présentes dans le
+# cache des solutions ne sont pas recherchées à nouveau (les durées ne
+# mesurent alors plus la recherche). Utilisation :
+#
+#     python lot.py grilles -o solutions -j 4 -t 60
+
+
+import os
+import sys
+import time
+import argparse
+from concurrent.futures import ProcessPoolExecutor, as_completed
+from moteur import Recherche, Statistiques, lit_grille, indices_grille
+from cache import ouvre_cache, repertoire_cache
+
+
+RESOLUE = 'resolue'
+SANS_SOLUTION = 'sans-solution'
+DELAI = 'delai'
+ERREUR = 'erreur'
+
+
+def liste_grilles(dossier):
+    """
+    Retourne la liste triée des fichiers .txt de dossier
+
+    :param dossier: str
+    :return value: list
+    """
+    return sorted(nom for nom in os.listdir(dossier)
+                  if nom.endswith('.txt')
+                  and os.path.isfile(os.path.join(dossier, nom)))
+
+
+def resout_grille(indices, delai=None, cache=None):
+    """
+    Résout la grille en abandonnant au bout de delai secondes (None pour
+    ne pas limiter la recherche). Retourne le triplet (statut, durée,
+    solution) où solution est le dict des segments de la boucle, ou None.
+    La base cache (CacheSolutions) éventuelle est consultée avant de
+    chercher, et reçoit les grilles résolues ou sans solution
+
+    :param indices: list
+    :param delai: float
+    :param cache: CacheSolutions
+    :return value: tuple
+
+    >>> statut, duree, solution = resout_grille([['2', '2'], ['2', '2']])
+    >>> statut, len(solution)
+    ('resolue', 8)
+    >>> resout_grille([['3', '0']])[::2]
+    ('sans-solution', None)
+    """
+    debut = time.perf_counter()
+    if cache is not None:
+        connue = cache.cherche(indices)
+        if connue is not None:
+            solution = connue[0]
+            return (RESOLUE if solution is not None else SANS_SOLUTION,
+                    time.perf_counter() - debut, solution)
+    arret = None
+    if delai is not None:
+        limite = debut + delai
+
+        def arret():
+            return time.perf_counter() > limite
+    recherche = Recherche(indices, arret=arret)
+    resultat = recherche.selectionne_sommet()
+    duree = time.perf_counter() - debut
+    if resultat is None:
+        return DELAI, duree, None
+    solution = None
+    if resultat is True:
+        solution = recherche.vers_etat({}, interdits=False)
+    if cache is not None:
+        cache.enregistre(indices, solution,
+                         Statistiques(recherche).vers_dict())
+    if solution is not None:
+        return RESOLUE, duree, solution
+    return SANS_SOLUTION, duree, None
+
+
+def resout_fichier(chemin, delai=None, cache=None):
+    """
+    Lit le fichier de grille chemin avec les règles du menu de sélection
+    des grilles et le résout. L'éventuelle partie en cours qu'il contient
+    est ignorée. cache est le dossier du cache des solutions (None pour
+    s'en passer). Retourne (grille, statut, durée, solution)
+
+    :param chemin: str
+    :param delai: float
+    :param cache: str
+    :return value: tuple
+    """
+    with open(chemin) as f:
+        grille = lit_grille(f)[0]
+    base = ouvre_cache(cache) if cache is not None else None
+    try:
+        statut, duree, solution = resout_grille(indices_grille(grille),
+                                                delai, base)
+    finally:
+        if base is not None:
+            base.ferme()
+    return grille, statut, duree, solution
+
+
+def ecrit_solution(chemin, grille, solution):
+    """
+    Écrit la grille suivie de sa solution au format des parties
+    sauvegardées, de sorte que le fichier puisse être rouvert dans le jeu
+
+    :param chemin: str
+    :param grille: list
+    :param solution: dict
+    """
+    with open(chemin, 'w') as f:
+        for ligne in grille:
+            f.write(ligne)
+        f.write(str(solution) + '\n')
+
+
+def resout_dossier(dossier, sortie, processus=None, delai=None,
+                   affichage=sys.stdout, cache=None):
+    """
+    Résout toutes les grilles de dossier sur processus processus. Dans le
+    dossier sortie, chaque grille résolue est écrite avec sa solution sous
+    le même nom et resultats.txt reçoit une ligne « nom statut durée » par
+    grille. Une grille illisible (vide, non rectangulaire...) a le statut
+    ERREUR sans interrompre les autres. cache est le dossier du cache des
+    solutions, ou None. Retourne la liste triée des triplets (nom, statut,
+    durée)
+
+    :param dossier: str
+    :param sortie: str
+    :param processus: int
+    :param delai: float
+    :param affichage: file
+    :param cache: str
+    :return value: list
+    """
+    os.makedirs(sortie, exist_ok=True)
+    resultats = []
+    with ProcessPoolExecutor(processus) as executeur:
+        taches = {executeur.submit(resout_fichier,
+                                   os.path.join(dossier, nom), delai,
+                                   cache): nom
+                  for nom in liste_grilles(dossier)}
+        for tache in as_completed(taches):
+            nom = taches[tache]
+            try:
+                grille, statut, duree, solution = tache.result()
+            except Exception as erreur:
+                statut, duree, solution = ERREUR, 0.0, None
+                print(nom, ':', erreur, file=sys.stderr)
+            if solution is not None:
+                ecrit_solution(os.path.join(sortie, nom), grille, solution)
+            resultats.append((nom, statut, duree))
+            if affichage is not None:
+                print(nom, statut, round(duree, 3), file=affichage)
+    resultats.sort()
+    with open(os.path.join(sortie, 'resultats.txt'), 'w') as f:
+        for nom, statut, duree in resultats:
+            f.write(nom + '\t' + statut + '\t' + str(round(duree, 6)) + '\n')
+    return resultats
+
+
+def main(arguments=None):
+    """
+    Point d'entrée en ligne de commande
+    """
+    analyseur = argparse.ArgumentParser(
+        description='Résout toutes les grilles .txt d\'un dossier')
+    analyseur.add_argument('dossier', nargs='?', default='grilles')
+    analyseur.add_argument('-o', '--sortie', default='solutions',
+                           help='dossier des solutions et de resultats.txt')
+    analyseur.add_argument('-j', '--processus', type=int, default=None,
+                           help='nombre de processus (tous les cœurs par '
+                                'défaut)')
+    analyseur.add_argument('-t', '--delai', type=float, default=None,
+                           help='temps maximal par grille, en secondes')
+    analyseur.add_argument('--cache', action='store_true',
+                           help='utilise le cache des solutions')
+    options = analyseur.parse_args(arguments)
+    resultats = resout_dossier(options.dossier, options.sortie,
+                               options.processus, options.delai,
+                               cache=repertoire_cache() if options.cache
+                               else None)
+    nombres = {}
+    for _, statut, _ in resultats:
+        nombres[statut] = nombres.get(statut, 0) + 1
+    print(len(resultats), 'grilles :',
+          ', '.join(statut + ' ' + str(nombre)
+                    for statut, nombre in sorted(nombres.items())))
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,203 @@
+##############################################################################
+#                                                                            #
+#                   Projet Slitherlink - Minimisation des indices            #
+#                                                                            #
+##############################################################################
+
+# Retire d'une grille à solution unique le plus d'indices possible sans que
+# la solution cesse d'être unique : plusieurs essais gloutons, chacun dans un
+# ordre aléatoire, dont on garde le meilleur. Retirer des indices ne peut
+# qu'ajouter des solutions, donc un indice qu'on ne peut pas retirer d'une
+# grille ne peut être retiré d'aucune grille qui en contient moins : ces
+# indices sont écartés une fois pour toutes. Les vérifications d'unicité
+# d'un même lot de retraits sont faites en parallèle. Utilisation :
+#
+#     python minimise.py grilles/grille2.txt -o grilles/grille2-min.txt -e 8
+
+
+import os
+import sys
+import random
+import argparse
+from itertools import repeat
+from concurrent.futures import ProcessPoolExecutor
+from moteur import lit_grille, indices_grille
+from generateur import est_unique, texte_grille
+
+
+def nombre_indices(indices):
+    """
+    Retourne le nombre d'indices de la grille
+
+    :param indices: list
+    :return value: int
+
+    >>> nombre_indices([['2', None], [None, '0']])
+    2
+    """
+    return sum(indice is not None for ligne in indices for indice in ligne)
+
+
+def sans_indice(indices, case):
+    """
+    Retourne une copie de indices où la case case n'a plus d'indice
+
+    :param indices: list
+    :param case: tuple
+    :return value: list
+
+    >>> sans_indice([['2', '1']], (0, 1))
+    [['2', None]]
+    """
+    copie = [ligne[:] for ligne in indices]
+    copie[case[0]][case[1]] = None
+    return copie
+
+
+def verifie_retraits(indices, cases, executeur=None, noeuds_max=None):
+    """
+    Retourne, pour chaque case de cases, si la grille reste à solution
+    unique quand on retire son indice. Avec un executeur, les vérifications
+    sont réparties sur ses processus
+
+    :param indices: list
+    :param cases: list
+    :param executeur: ProcessPoolExecutor
+    :param noeuds_max: int
+    :return value: list
+
+    >>> verifie_retraits([['3', '3']], [(0, 0), (0, 1)])
+    [True, True]
+    """
+    grilles = [sans_indice(indices, case) for case in cases]
+    if executeur is None:
+        return [est_unique(grille, noeuds_max) for grille in grilles]
+    return list(executeur.map(est_unique, grilles, repeat(noeuds_max)))
+
+
+def essai_glouton(indices, candidates, generateur, taille_lot=1,
+                  executeur=None, noeuds_max=None):
+    """
+    Retourne une copie de indices dont on a retiré, dans un ordre aléatoire,
+    chaque indice des cases candidates qui peut l'être. Les retraits sont
+    vérifiés par lots de taille_lot sur la grille courante : le premier
+    retrait possible du lot est fait, ceux qui suivent sont à revérifier sur
+    la nouvelle grille et ceux qui sont impossibles sont définitivement
+    écartés
+
+    :param indices: list
+    :param candidates: list
+    :param generateur: random.Random
+    :param taille_lot: int
+    :param executeur: ProcessPoolExecutor
+    :param noeuds_max: int
+    :return value: list
+    """
+    indices = [ligne[:] for ligne in indices]
+    attente = list(candidates)
+    generateur.shuffle(attente)
+    while attente:
+        lot, attente = attente[:taille_lot], attente[taille_lot:]
+        possibles = verifie_retraits(indices, lot, executeur, noeuds_max)
+        for k, (case, possible) in enumerate(zip(lot, possibles)):
+            if possible:
+                indices[case[0]][case[1]] = None
+                attente = [autre for autre, retirable
+                           in zip(lot[k + 1:], possibles[k + 1:])
+                           if retirable] + attente
+                break
+    return indices
+
+
+def minimise(indices, essais=4, graine=None, processus=1, noeuds_max=None):
+    """
+    Retourne la grille à solution unique ayant le moins d'indices trouvée
+    par essais essais gloutons (essai_glouton) à partir de indices. Les
+    vérifications sont réparties sur processus processus (None pour tous
+    les cœurs). Avec noeuds_max, une vérification qui dépasse ce nombre de
+    nœuds compte comme un échec : c'est plus rapide, mais la grille peut
+    garder des indices inutiles. Lève ValueError si la grille de départ n'a
+    pas une solution unique
+
+    :param indices: list
+    :param essais: int
+    :param graine: int
+    :param processus: int
+    :param noeuds_max: int
+    :return value: list
+
+    >>> grille = [['2', '3', '2'], ['3', '0', '3'], ['2', '3', '2']]
+    >>> resultat = minimise(grille, essais=2, graine=0)
+    >>> nombre_indices(resultat) < 9, est_unique(resultat, None)
+    (True, True)
+    >>> minimise([[None, None]])
+    Traceback (most recent call last):
+    ...
+    ValueError: la grille n'a pas une solution unique
+    """
+    if not est_unique(indices, noeuds_max):
+        raise ValueError("la grille n'a pas une solution unique")
+    generateur = random.Random(graine)
+    cases = [(i, j) for i in range(len(indices))
+             for j in range(len(indices[i])) if indices[i][j] is not None]
+    if processus is None:
+        processus = os.cpu_count() or 1
+    executeur = None
+    if processus > 1:
+        executeur = ProcessPoolExecutor(processus)
+    try:
+        # Indices impossibles à retirer de la grille complète : nécessaires
+        # à toutes les grilles explorées
+        candidates = [case for case, possible in zip(
+            cases, verifie_retraits(indices, cases, executeur, noeuds_max))
+            if possible]
+        meilleure = indices
+        for _ in range(max(1, essais)):
+            resultat = essai_glouton(indices, candidates, generateur,
+                                     processus, executeur, noeuds_max)
+            if nombre_indices(resultat) < nombre_indices(meilleure):
+                meilleure = resultat
+    finally:
+        if executeur is not None:
+            executeur.shutdown()
+    return meilleure
+
+
+def main(arguments=None):
+    """
+    Point d'entrée en ligne de commande
+    """
+    analyseur = argparse.ArgumentParser(
+        description='Retire les indices inutiles d\'une grille à solution '
+                    'unique')
+    analyseur.add_argument('grille', help='fichier de la grille')
+    analyseur.add_argument('-o', '--sortie',
+                           help='fichier où écrire la grille (la grille '
+                                'elle-même par défaut)')
+    analyseur.add_argument('-e', '--essais', type=int, default=4,
+                           help='nombre d\'essais gloutons')
+    analyseur.add_argument('-g', '--graine', type=int, default=None)
+    analyseur.add_argument('-j', '--processus', type=int, default=None,
+                           help='nombre de processus (tous les cœurs par '
+                                'défaut)')
+    analyseur.add_argument('--noeuds-max', type=int, default=None,
+                           help='effort maximal de chaque vérification '
+                                '(sans limite par défaut)')
+    options = analyseur.parse_args(arguments)
+    with open(options.grille) as f:
+        indices = indices_grille(lit_grille(f)[0])
+    try:
+        resultat = minimise(indices, options.essais, options.graine,
+                            options.processus, options.noeuds_max)
+    except ValueError as erreur:
+        print(options.grille, ':', erreur, file=sys.stderr)
+        return 1
+    with open(options.sortie or options.grille, 'w') as f:
+        f.write(texte_grille(resultat))
+    print(options.grille, ':', nombre_indices(indices), '->',
+          nombre_indices(resultat), 'indices', file=sys.stderr)
+    return 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
@@ -0,0 +1,1808 @@
+##############################################################################
+#                                                                            #
+#                      Projet Slitherlink - Moteur                           #
+#                                                                            #
+##############################################################################
+
+# Règles du jeu et solveur, sans aucune dépendance à fltk ni à tkinter : ce
+# module peut être utilisé depuis un script ou un processus sans affichage.
+
+
+import ast
+import time
+import random
+import cProfile
+import tracemalloc
+from math import comb, floor
+from functools import lru_cache
+from collections import OrderedDict
+from doctest import testmod
+
+
+def cases_segment(segment):
+    """
+    Retourne les deux cases bordées par segment (certaines peuvent être hors
+    de la grille)
+
+    :param segment: tuple
+    :return value: tuple
+
+    >>> cases_segment(((1, 2), (1, 3)))
+    ((0, 2), (1, 2))
+    >>> cases_segment(((1, 2), (2, 2)))
+    ((1, 1), (1, 2))
+    """
+    (x1, y1), (x2, y2) = segment
+    if x1 == x2:
+        return (x1 - 1, y1), (x1, y1)
+    return (x1, y1 - 1), (x1, y1)
+
+
+class Etat(dict):
+    """
+    Dictionnaire des segments (1 tracé, -1 interdit) qui tient à jour, à
+    chaque tracé, effacement ou interdiction, les segments tracés autour de
+    chaque sommet, le nombre de segments tracés autour de chaque case et le
+    nombre total de segments tracés. Les fonctions du moteur s'en servent
+    pour répondre en temps constant au lieu de parcourir tout etat.
+
+    >>> etat = Etat({((0, 0), (0, 1)): 1, ((0, 1), (1, 1)): -1})
+    >>> etat.nb_traces, etat.cases[(0, 0)], etat.sommets[(0, 1)]
+    (1, 1, [((0, 0), (0, 1))])
+    >>> etat = effacer_segment(etat, ((0, 0), (0, 1)))
+    >>> etat
+    {((0, 1), (1, 1)): -1}
+    >>> etat.nb_traces, etat.cases[(0, 0)], etat.sommets[(0, 1)]
+    (0, 0, [])
+    """
+
+    def __init__(self, etat=()):
+        super().__init__()
+        self.sommets = {}
+        self.cases = {}
+        self.nb_traces = 0
+        self.update(etat)
+
+    def __reduce__(self):
+        return Etat, (dict(self),)
+
+    def __setitem__(self, segment, valeur):
+        if self.get(segment) == 1:
+            self._retire(segment)
+        super().__setitem__(segment, valeur)
+        if valeur == 1:
+            self._ajoute(segment)
+
+    def __delitem__(self, segment):
+        if self.get(segment) == 1:
+            self._retire(segment)
+        super().__delitem__(segment)
+
+    def pop(self, segment, *defaut):
+        if self.get(segment) == 1:
+            self._retire(segment)
+        return super().pop(segment, *defaut)
+
+    def update(self, etat=()):
+        for segment, valeur in dict(etat).items():
+            self[segment] = valeur
+
+    def clear(self):
+        super().clear()
+        self.sommets.clear()
+        self.cases.clear()
+        self.nb_traces = 0
+
+    def copy(self):
+        return Etat(self)
+
+    def _ajoute(self, segment):
+        for sommet in segment:
+            self.sommets.setdefault(sommet, []).append(segment)
+        for case in cases_segment(segment):
+            self.cases[case] = self.cases.get(case, 0) + 1
+        self.nb_traces += 1
+
+    def _retire(self, segment):
+        for sommet in segment:
+            self.sommets[sommet].remove(segment)
+        for case in cases_segment(segment):
+            self.cases[case] -= 1
+        self.nb_traces -= 1
+
+
+class EtatJeu(Etat):
+    """
+    Etat d'une partie qui tient aussi à jour, à chaque tracé ou effacement,
+    ce qu'il faut pour savoir en temps constant si elle est gagnée : le
+    nombre d'indices non satisfaits, le nombre de sommets de degré 1 ou
+    supérieur à 2 et le nombre de composantes connexes des segments tracés
+    (union-find). Un effacement pouvant couper une composante, ce dernier
+    nombre est alors recalculé, mais seulement quand il est demandé, donc
+    quand tous les indices et tous les sommets sont corrects.
+
+    >>> etat = EtatJeu([['3', '3']])
+    >>> for segment in (((0, 0), (0, 1)), ((0, 1), (0, 2)),
+    ...                 ((0, 2), (1, 2)), ((1, 1), (1, 2))):
+    ...     etat[segment] = 1
+    >>> etat.insatisfaits, etat.sommets_faux, etat.composantes()
+    (1, 2, 1)
+    >>> etat[((1, 0), (1, 1))] = etat[((0, 0), (1, 0))] = 1
+    >>> etat.gagne()
+    True
+    >>> etat[((0, 0), (0, 1))] = -1
+    >>> etat.gagne(), etat.insatisfaits, etat.sommets_faux
+    (False, 1, 2)
+    >>> etat[((0, 0), (0, 1))] = 1
+    >>> etat.gagne()
+    True
+    """
+
+    def __init__(self, indices, etat=()):
+        self.grille = indices
+        self.indices = {(x, y): int(indice)
+                        for x, ligne in enumerate(indices)
+                        for y, indice in enumerate(ligne)
+                        if indice is not None}
+        self.insatisfaits = sum(indice != 0
+                                for indice in self.indices.values())
+        self.sommets_faux = 0
+        self.parents = {}
+        self.nb_composantes = 0
+        super().__init__(etat)
+
+    def __reduce__(self):
+        return EtatJeu, (self.grille, dict(self))
+
+    def clear(self):
+        super().clear()
+        self.insatisfaits = sum(indice != 0
+                                for indice in self.indices.values())
+        self.sommets_faux = 0
+        self.parents = {}
+        self.nb_composantes = 0
+
+    def copy(self):
+        return EtatJeu(self.grille, self)
+
+    def _ajoute(self, segment):
+        super()._ajoute(segment)
+        self._compte(segment, 1)
+        if self.nb_composantes is not None:
+            for sommet in segment:
+                if len(self.sommets[sommet]) == 1:
+                    self.parents[sommet] = sommet
+                    self.nb_composantes += 1
+            self._relie(*segment)
+
+    def _retire(self, segment):
+        super()._retire(segment)
+        self._compte(segment, -1)
+        self.nb_composantes = None
+
+    def _compte(self, segment, nombre):
+        """
+        Met à jour insatisfaits et sommets_faux quand nombre (1 ou -1)
+        segment est ajouté autour des cases et des sommets de segment
+        """
+        for case in cases_segment(segment):
+            if case in self.indices:
+                indice = self.indices[case]
+                avant = self.cases[case] - nombre
+                self.insatisfaits += (self.cases[case] != indice) \
+                    - (avant != indice)
+        for sommet in segment:
+            degre = len(self.sommets[sommet])
+            self.sommets_faux += (degre not in (0, 2)) \
+                - (degre - nombre not in (0, 2))
+
+    def _racine(self, sommet):
+        """
+        Retourne le représentant de la composante de sommet
+        """
+        parents = self.parents
+        while parents[sommet] != sommet:
+            parents[sommet] = parents[parents[sommet]]
+            sommet = parents[sommet]
+        return sommet
+
+    def _relie(self, a, b):
+        """
+        Réunit les composantes des sommets a et b
+        """
+        a, b = self._racine(a), self._racine(b)
+        if a != b:
+            self.parents[a] = b
+            self.nb_composantes -= 1
+
+    def composantes(self):
+        """
+        Retourne le nombre de composantes connexes des segments tracés, en
+        le recalculant si un segment a été effacé depuis le dernier calcul
+
+        :return value: int
+        """
+        if self.nb_composantes is None:
+            self.parents = {sommet: sommet for sommet, autour
+                            in self.sommets.items() if autour}
+            self.nb_composantes = len(self.parents)
+            for segment, valeur in self.items():
+                if valeur == 1:
+                    self._relie(*segment)
+        return self.nb_composantes
+
+    def gagne(self):
+        """
+        Indique si les segments tracés forment une seule boucle qui
+        satisfait tous les indices
+
+        :return value: bool
+        """
+        return (self.nb_traces > 0 and self.insatisfaits == 0
+                and self.sommets_faux == 0 and self.composantes() == 1)
+
+
+def est_trace(etat, segment):
+    """
+    Renvoie True si le segment est tracé, False sinon
+
+    :param etat: dict
+    :param segment: tuple
+    :return value: bool
+
+    >>> est_trace({}, ((0, 0), (0, 1)))
+    False
+    >>> est_trace({((0, 0), (0, 1)): 1}, ((0, 0), (0, 1)))
+    True
+    """
+    if segment in etat and etat[segment] == 1:
+        return True
+    return False
+
+
+def est_interdit(etat, segment):
+    """
+    Renvoie True si le segment est interdit, False sinon
+
+    :param etat: dict
+    :param segment: tuple
+    :return value: bool
+
+    >>> est_interdit({}, ((0, 0), (0, 1)))
+    False
+    >>> est_interdit({((0, 0), (0, 1)): -1}, ((0, 0), (0, 1)))
+    True
+    """
+    if segment in etat and etat[segment] == -1:
+        return True
+    return False
+
+
+def est_vierge(etat, segment):
+    """
+    Renvoie True si le segment est vierge, False sinon
+
+    :param etat: dict
+    :param segment: tuple
+    :return value: bool
+
+    >>> est_vierge({}, ((0, 0), (0, 1)))
+    True
+    >>> est_vierge({((0, 0), (0, 1)): 1}, ((0, 0), (0, 1)))
+    False
+    """
+    if segment not in etat:
+        return True
+    return False
+
+
+def tracer_segment(etat, segment):
+    """
+    Trace segment dans etat
+
+    :param etat: dict
+    :param segment: tuple
+    :return value: dict
+
+    >>> tracer_segment({}, ((0, 0), (1, 0)))
+    {((0, 0), (1, 0)): 1}
+    """
+    etat[segment] = 1
+    return etat
+
+
+def interdire_segment(etat, segment):
+    """
+    Interdit segment dans etat
+
+    :param etat: dict
+    :param segment: tuple
+    :return value: dict
+
+    >>> interdire_segment({}, ((0, 0), (1, 0)))
+    {((0, 0), (1, 0)): -1}
+    """
+    etat[segment] = -1
+    return etat
+
+
+def effacer_segment(etat, segment):
+    """
+    Efface segment dans etat
+
+    :param etat: dict
+    :param segment: tuple
+    :return value: dict
+
+    >>> effacer_segment({((0, 0), (1, 0)): 1}, ((0, 0), (1, 0)))
+    {}
+    """
+    etat.pop(segment)
+    return etat
+
+
+def segments_traces(etat, sommet):
+    """
+    Renvoie la liste des segments tracés autour d'un sommet
+
+    :param etat: dict
+    :param sommet: tuple
+    :return value: list
+
+    >>> segments_traces({((2, 2), (3, 2)): 1, ((2, 2), (2, 3)): 1}, (2, 2))
+    [((2, 2), (3, 2)), ((2, 2), (2, 3))]
+    """
+    if isinstance(etat, Etat):
+        return list(etat.sommets.get(sommet, ()))
+    liste_segments = []
+    for segment in etat:
+        if sommet in segment and etat[segment] == 1:
+            liste_segments.append(segment)
+    return liste_segments
+
+
+def statut_case(indices, etat, case):
+    """
+    Retourne le statut de la case passée en paramètre. 0 si l'indice est
+    satisfait, -1 et 1 si il ne l'est pas, pas assez ou trop de segments
+    autour
+
+    :param indices: list
+    :param etat: dict
+    :param case: tuple
+
+    >>> indices = [[None, 3, 1]]
+    >>> etat = {((0, 1), (0, 2)): 1, ((0, 2), (0, 3)): 1, ((0, 3), (1, 3)): 1}
+    >>> statut_case(indices, etat, (0, 1))
+    -1
+    >>> statut_case(indices, etat, (0, 2))
+    1
+    >>> etat = {((0, 1), (0, 2)): 1, ((0, 2), (0, 3)): 1}
+    >>> statut_case(indices, etat, (0, 2))
+    0
+    """
+    x, y = case
+    if indices[x][y] is None:
+        return None
+    else:
+        liste_segments = [(case, (x, y+1)), (case, (x+1, y)),
+                          ((x+1, y), (x+1, y+1)), ((x, y+1), (x+1, y+1))]
+        nombre_segments = 0
+
+        if isinstance(etat, Etat):
+            nombre_segments = etat.cases.get(case, 0)
+        else:
+            for segment in etat:
+                if segment in liste_segments and etat[segment] == 1:
+                    nombre_segments += 1
+        if int(indices[x][y]) == nombre_segments:
+            return 0
+        elif int(indices[x][y]) < nombre_segments:
+            return 1
+        elif int(indices[x][y]) > nombre_segments:
+            return -1
+
+
+def indices_satisfaits(indices, etat):
+    """
+    Renvoie True si tous les indices sont satisfaits, False sinon
+
+    :param indices: list
+    :param etat: dict
+
+    >>> indices = [[2, 1]]
+    >>> etat = {((0, 0), (0, 1)): 1, ((0, 1), (1, 1)): 1}
+    >>> indices_satisfaits(indices, etat)
+    True
+    >>> etat = {((0, 0), (0, 1)): 1, ((0, 1), (0, 2)): 1}
+    >>> indices_satisfaits(indices, etat)
+    False
+    """
+    indice = []
+    for i in range(len(indices)):
+        for j in range(len(indices[i])):
+            if indices[i][j] is not None:
+                case = (i, j)
+                indice.append(statut_case(indices, etat, case))
+    for elem in indice:
+        if elem != 0:
+            return False
+    return True
+
+
+def longueur_boucle(etat, segment):
+    """
+    Renvoie la longueur de la boucle si les segments forment une boucle sinon
+    renvoie None
+
+    :param etat: dict
+    :param sommet: tuple
+
+    >>> etat = {((0, 0), (0, 1)): 1, ((0, 1), (1, 1)): 1}
+    >>> etat2 = {((1, 0), (1, 1)): 1, ((0, 0), (1, 0)): 1}
+    >>> etat.update(etat2)
+    >>> longueur_boucle(etat, ((0, 0), (1, 0)))
+    4
+    >>> etat = {((0, 0), (0, 1)): 1, ((0, 1), (1, 1)): 1}
+    >>> longueur_boucle(etat, ((0, 1), (1, 1)))
+    """
+    depart = segment[0]
+    precedent = segment[0]
+    courant = segment[1]
+    nb_seg = 0
+    while courant != depart:
+        segments_courant = segments_traces(etat, courant)
+        if len(segments_courant) != 2:
+            return None
+        else:
+            nb_seg += 1
+            for seg in segments_courant:
+                if precedent not in seg:
+                    precedent = courant
+                    for point in seg:
+                        if point != precedent:
+                            courant = point
+    nb_seg += 1
+    return nb_seg
+
+
+def nombre_segments(etat):
+    """
+    Renvoie la nombre de segments au total dans segments
+
+    :param etat: dict
+
+    >>> etat = {((0, 0), (0, 1)): 1, ((0, 1), (0, 2)): 1}
+    >>> nombre_segments(etat)
+    2
+    """
+    if isinstance(etat, Etat):
+        return etat.nb_traces
+    nb_total_seg = 0
+    for segment in etat:
+        if etat[segment] == 1:
+            nb_total_seg += 1
+    return nb_total_seg
+
+
+def victoire(etat, indices, segment):
+    """
+    Renvoie True si le joueur gagne, False sinon. Avec un EtatJeu, la
+    réponse est immédiate (EtatJeu.gagne)
+
+    :param etat: dict
+    :param indices: list
+    :param segment: tuple
+
+    >>> etat = {((0, 0), (0, 1)): 1, ((0, 1), (0, 2)): 1, ((0, 2), (1, 2)): 1}
+    >>> etat2 = {((1, 2), (2, 2)): 1, ((2, 1), (2, 2)): 1}
+    >>> etat3 = {((2, 0), (2, 1)): 1, ((1, 0), (2, 0)): 1, ((0, 0), (1, 0)): 1}
+    >>> etat.update(etat2)
+    >>> etat.update(etat3)
+    >>> indices = [[2, 2], [2, 2]]
+    >>> victoire(etat, indices, ((0, 0), (1, 0)))
+    True
+    """
+    if segment is not None:
+        if isinstance(etat, EtatJeu):
+            return etat.gagne()
+        if indices_satisfaits(indices, etat) and \
+                longueur_boucle(etat, segment) == nombre_segments(etat):
+            return True
+    return False
+
+
+def segments_case(case):
+    """
+    Retourne les quatre segments autour de case
+
+    :param case: tuple
+    :return value: list
+
+    >>> segments_case((0, 0))
+    [((0, 0), (0, 1)), ((0, 0), (1, 0)), ((1, 0), (1, 1)), ((0, 1), (1, 1))]
+    """
+    x, y = case
+    return [(case, (x, y+1)), (case, (x+1, y)),
+            ((x+1, y), (x+1, y+1)), ((x, y+1), (x+1, y+1))]
+
+
+class Geometrie:
+    """
+    Numérotation des sommets, des segments et des cases d'une grille de
+    hauteur x largeur cases, avec les tables d'adjacence précalculées. Le
+    numéro d'un segment est son identifiant pour le solveur, l'affichage et
+    les sauvegardes ; le format ((x1, y1), (x2, y2)) ne sert qu'aux
+    échanges (etat, fichiers) :
+
+    - sommets : numéro -> (x, y), numero_sommet(x, y) = x * (largeur+1) + y ;
+    - segments : numéro -> segment au format ((x1, y1), (x2, y2)) et numeros
+      pour l'inverse ;
+    - extremites : numéro de segment -> numéros de ses deux sommets ;
+    - autour_sommet : numéro de sommet -> couples (segment, autre sommet)
+      dans l'ordre droite, bas, gauche, haut ;
+    - autour_case : numéro de case (x * largeur + y) -> ses quatre segments ;
+    - cases_segment : numéro de segment -> cases de la grille qu'il borde ;
+    - cases_sommet : numéro de sommet -> cases dont il est un coin ;
+    - coins_segment : numéro de segment -> sommets des cases qu'il borde ;
+    - pixels et segment_pixel pour passer des segments aux coordonnées du
+      canevas et inversement.
+
+    >>> geometrie = Geometrie(1, 2)
+    >>> len(geometrie.sommets), len(geometrie.segments)
+    (6, 7)
+    >>> geometrie.segments[geometrie.autour_case[1][3]]
+    ((0, 2), (1, 2))
+    >>> geometrie.cases_segment[geometrie.numeros[((0, 1), (1, 1))]]
+    [0, 1]
+    >>> geometrie.cases_sommet[1], geometrie.coins_segment[0]
+    ([0, 1], (0, 1, 3, 4))
+    """
+
+    def __init__(self, hauteur, largeur):
+        self.hauteur = hauteur
+        self.largeur = largeur
+        self.sommets = [(x, y) for x in range(hauteur + 1)
+                        for y in range(largeur + 1)]
+        self.segments = []
+        self.numeros = {}
+        self.extremites = []
+        for x, y in self.sommets:
+            if y < largeur:
+                self.ajoute_segment(((x, y), (x, y + 1)))
+            if x < hauteur:
+                self.ajoute_segment(((x, y), (x + 1, y)))
+        self.autour_sommet = [[] for _ in self.sommets]
+        for x, y in self.sommets:
+            sommet = self.numero_sommet(x, y)
+            for segment in (((x, y), (x, y + 1)), ((x, y), (x + 1, y)),
+                            ((x, y - 1), (x, y)), ((x - 1, y), (x, y))):
+                if segment in self.numeros:
+                    numero = self.numeros[segment]
+                    a, b = self.extremites[numero]
+                    self.autour_sommet[sommet].append(
+                        (numero, b if a == sommet else a))
+        self.autour_case = []
+        for x in range(hauteur):
+            for y in range(largeur):
+                self.autour_case.append([self.numeros[segment] for segment
+                                         in segments_case((x, y))])
+        self.cases_segment = []
+        for segment in self.segments:
+            self.cases_segment.append(
+                [x * largeur + y for x, y in cases_segment(segment)
+                 if 0 <= x < hauteur and 0 <= y < largeur])
+        self.cases_sommet = [[] for _ in self.sommets]
+        coins_case = []
+        for x in range(hauteur):
+            for y in range(largeur):
+                coins = (self.numero_sommet(x, y),
+                         self.numero_sommet(x, y + 1),
+                         self.numero_sommet(x + 1, y),
+                         self.numero_sommet(x + 1, y + 1))
+                for sommet in coins:
+                    self.cases_sommet[sommet].append(x * largeur + y)
+                coins_case.append(coins)
+        self.coins_segment = [tuple(sorted({sommet for case in cases
+                                            for sommet in coins_case[case]}))
+                              for cases in self.cases_segment]
+
+    def numero_sommet(self, x, y):
+        """
+        Retourne le numéro du sommet (x, y)
+        """
+        return x * (self.largeur + 1) + y
+
+    def ajoute_segment(self, segment):
+        """
+        Numérote un nouveau segment
+        """
+        self.numeros[segment] = len(self.segments)
+        self.segments.append(segment)
+        self.extremites.append((self.numero_sommet(*segment[0]),
+                                self.numero_sommet(*segment[1])))
+
+    def pixels(self, marge, case):
+        """
+        Retourne, pour chaque numéro de segment, les coordonnées (ax, ay, bx,
+        by) de ses extrémités sur le canevas, la grille étant dessinée à
+        marge pixels du bord avec des cases de case pixels (x est la
+        ligne, donc l'ordonnée)
+
+        :param marge: float
+        :param case: float
+        :return value: list
+
+        >>> Geometrie(1, 1).pixels(25, 50)[:2]
+        [(25, 25, 75, 25), (25, 25, 25, 75)]
+        """
+        return [(int(y1 * case + marge), int(x1 * case + marge),
+                 int(y2 * case + marge), int(x2 * case + marge))
+                for (x1, y1), (x2, y2) in self.segments]
+
+    def segment_pixel(self, abscisse, ordonnee, marge, case, tolerance=0.2):
+        """
+        Retourne le numéro du segment proche du point (abscisse, ordonnee)
+        du canevas, ou None : le point doit être à moins de tolerance case
+        de la ligne du segment. Près d'un sommet, le segment horizontal
+        l'emporte
+
+        :param abscisse: float
+        :param ordonnee: float
+        :param marge: float
+        :param case: float
+        :param tolerance: float
+        :return value: int
+
+        >>> geometrie = Geometrie(1, 1)
+        >>> geometrie.segment_pixel(50, 27, 25, 50)
+        0
+        >>> geometrie.segment_pixel(73, 50, 25, 50)
+        2
+        >>> geometrie.segment_pixel(50, 50, 25, 50) is None
+        True
+        """
+        x = (ordonnee - marge) / case
+        y = (abscisse - marge) / case
+        if abs(x - round(x)) < tolerance:
+            segment = ((round(x), floor(y)), (round(x), floor(y) + 1))
+        elif abs(y - round(y)) < tolerance:
+            segment = ((floor(x), round(y)), (floor(x) + 1, round(y)))
+        else:
+            return None
+        return self.numeros.get(segment)
+
+
+@lru_cache(maxsize=16)
+def geometrie_grille(hauteur, largeur):
+    """
+    Retourne la Geometrie d'une grille de hauteur x largeur cases. Ses
+    tables ne sont jamais modifiées : elle est construite une seule fois par
+    dimensions et partagée par toutes les recherches
+
+    :param hauteur: int
+    :param largeur: int
+    :return value: Geometrie
+
+    >>> geometrie_grille(3, 4) is geometrie_grille(3, 4)
+    True
+    """
+    return Geometrie(hauteur, largeur)
+
+
+VIERGE, TRACE, INTERDIT = 0, 1, 2
+
+# Critères possibles pour choisir l'extrémité de chemin sur laquelle
+# brancher : la tête du chemin suivi, le moins de segments vierges, l'indice
+# voisin le plus serré, le chemin le plus long, l'extrémité ouverte le plus
+# récemment, le plus petit numéro. En tête du départage, 'suivi' prolonge
+# toujours le même chemin, parti d'un sommet d'un indice 3, puis 2, 1 ou
+# d'une case vide (l'ordre de l'ancienne recherche sommet par sommet).
+# DEPARTAGE est l'ordre utilisé par défaut
+CRITERES = ('suivi', 'options', 'indices', 'longueur', 'recent', 'numero')
+DEPARTAGE = ('options', 'indices', 'recent', 'numero')
+
+# Critères qui ne dépendent que des segments autour de l'extrémité : ceux
+# qui ouvrent le départage servent à ranger les extrémités par paniers
+LOCAUX = ('options', 'indices')
+
+# Ordres de départage des relances : quand une tentative dépasse son budget
+# de nœuds, la recherche repart de la racine avec l'ordre suivant. Une
+# grille qui s'enlise avec un ordre est souvent vite résolue par un autre
+RELANCES = (DEPARTAGE, ('options', 'recent', 'numero'), ('suivi', 'numero'))
+
+# Budget de nœuds de la première tentative, doublé à chaque relance
+NOEUDS_RELANCE = 2000
+
+
+# Causes d'abandon d'une branche : indice dépassé (ou impossible à
+# atteindre), sommet de degré impossible, boucle fermée trop tôt
+ELAGAGES = ('indice', 'degre', 'boucle')
+
+# Étapes d'une résolution : conversion de la grille et de l'état de départ,
+# propagation initiale des déductions, recherche arborescente
+ETAPES = ('lecture', 'propagation', 'recherche')
+
+# Nombre de nœuds entre deux consultations de la fonction d'arrêt d'une
+# Recherche (horloge, signal d'un autre processus...)
+INTERVALLE_ARRET = 256
+
+
+class Statistiques:
+    """
+    Bilan d'une résolution : nœuds visités, retours en arrière, branches
+    abandonnées par cause (ELAGAGES), profondeur maximale de l'arbre de
+    recherche, solutions trouvées, relances (voir RELANCES), durée de chaque
+    étape (ETAPES) en secondes et, si elle a été mesurée, mémoire maximale
+    en octets (None sinon)
+
+    >>> recherche = Recherche([['3', '0']])
+    >>> recherche.selectionne_sommet()
+    False
+    >>> statistiques = Statistiques(recherche)
+    >>> statistiques.noeuds, statistiques.elagages['indice']
+    (0, 1)
+    >>> sorted(statistiques.vers_dict())[:3]
+    ['durees', 'elagages', 'memoire']
+    """
+
+    def __init__(self, recherche=None):
+        self.noeuds = 0
+        self.retours = 0
+        self.elagages = dict.fromkeys(ELAGAGES, 0)
+        self.profondeur_max = 0
+        self.solutions = 0
+        self.relances = 0
+        self.durees = dict.fromkeys(ETAPES, 0.0)
+        self.memoire = None
+        if recherche is not None:
+            self.releve(recherche)
+
+    def __repr__(self):
+        return 'Statistiques(%r)' % self.vers_dict()
+
+    def releve(self, recherche):
+        """
+        Recopie les compteurs de recherche (une Recherche)
+
+        :param recherche: Recherche
+        """
+        self.noeuds = recherche.noeuds
+        self.retours = recherche.retours
+        self.elagages.update(recherche.elagages)
+        self.profondeur_max = recherche.profondeur_max
+        self.solutions = recherche.nb_solutions
+        self.relances = recherche.nb_relances
+        self.durees.update(recherche.durees)
+
+    def duree(self):
+        """
+        Retourne la durée totale de la résolution, en secondes
+
+        :return value: float
+        """
+        return sum(self.durees.values())
+
+    def vers_dict(self):
+        """
+        Retourne les statistiques sous forme de dict (pour JSON)
+
+        :return value: dict
+        """
+        return {'noeuds': self.noeuds, 'retours': self.retours,
+                'elagages': dict(self.elagages),
+                'profondeur_max': self.profondeur_max,
+                'solutions': self.solutions, 'relances': self.relances,
+                'durees': dict(self.durees), 'memoire': self.memoire}
+
+
+def cles_zobrist(geometrie, indices):
+    """
+    Retourne les clés de Zobrist des segments (cles[numero][valeur], nulle
+    pour VIERGE) et le hachage de la grille sans aucun segment, qui dépend
+    des indices. Les clés ne dépendent que des dimensions de la grille : une
+    table de transposition peut être partagée entre plusieurs recherches,
+    même sur des grilles différentes
+
+    :param geometrie: Geometrie
+    :param indices: list
+    :return value: tuple
+
+    >>> cles, hachage = cles_zobrist(Geometrie(1, 1), [2])
+    >>> autre = cles_zobrist(Geometrie(1, 1), [3])[1]
+    >>> len(cles), cles[0][VIERGE], hachage == autre
+    (4, 0, False)
+    """
+    aleatoire = random.Random('%dx%d' % (geometrie.hauteur,
+                                         geometrie.largeur))
+    cles = [(0, aleatoire.getrandbits(64), aleatoire.getrandbits(64))
+            for _ in geometrie.segments]
+    hachage = 0
+    for indice in indices:
+        cles_case = [aleatoire.getrandbits(64) for _ in range(5)]
+        hachage ^= cles_case[4 if indice is None else indice]
+    return cles, hachage
+
+
+class TableTransposition:
+    """
+    Table bornée des nœuds réfutés de la recherche : la clé d'un nœud (le
+    hachage de son état, qui détermine aussi le segment sur lequel la
+    recherche branche) y est ajoutée quand aucune boucle ne prolonge cet
+    état, et la recherche saute ensuite ce nœud si elle le retrouve.
+    Au-delà de taille entrées, la politique 'lru' oublie l'entrée la moins
+    récemment utilisée, la politique 'profondeur' range les entrées dans
+    taille emplacements et ne remplace une entrée que par une réfutation
+    ayant demandé au moins autant de nœuds (les plus coûteuses à refaire
+    sont gardées)
+
+    >>> table = TableTransposition(2)
+    >>> for cle in 'abc':
+    ...     table.ajoute(cle, 1)
+    >>> len(table), 'a' in table, 'c' in table
+    (2, False, True)
+    >>> TableTransposition(2, 'hasard')
+    Traceback (most recent call last):
+    ...
+    ValueError: politique inconnue : hasard
+    """
+
+    def __init__(self, taille=1 << 16, politique='lru'):
+        if politique not in ('lru', 'profondeur'):
+            raise ValueError('politique inconnue : ' + str(politique))
+        self.taille = taille
+        self.politique = politique
+        self.succes = 0
+        if politique == 'lru':
+            self.entrees = OrderedDict()
+        else:
+            self.entrees = [None] * taille
+
+    def __len__(self):
+        if self.politique == 'lru':
+            return len(self.entrees)
+        return self.taille - self.entrees.count(None)
+
+    def __contains__(self, cle):
+        if self.politique == 'lru':
+            trouve = cle in self.entrees
+            if trouve:
+                self.entrees.move_to_end(cle)
+        else:
+            entree = self.entrees[hash(cle) % self.taille]
+            trouve = entree is not None and entree[0] == cle
+        if trouve:
+            self.succes += 1
+        return trouve
+
+    def ajoute(self, cle, travail):
+        """
+        Enregistre la réfutation de cle, travail étant le nombre de nœuds
+        qu'elle a demandés
+        """
+        if self.politique == 'lru':
+            self.entrees[cle] = travail
+            self.entrees.move_to_end(cle)
+            if len(self.entrees) > self.taille:
+                self.entrees.popitem(last=False)
+        else:
+            place = hash(cle) % self.taille
+            entree = self.entrees[place]
+            if entree is None or entree[1] <= travail:
+                self.entrees[place] = (cle, travail)
+
+
+class Recherche:
+    """
+    État compact du solveur. La valeur de chaque segment (VIERGE, TRACE ou
+    INTERDIT) est rangée dans un bytearray indexé par numéro de segment, et
+    des compteurs par sommet et par case sont tenus à jour à chaque
+    affectation. Chaque affectation est empilée dans pile, annuler revient à
+    dépiler : un retour en arrière ne coûte que les segments modifiés. Les
+    conversions depuis et vers le format etat (dict) ne sont faites qu'à
+    l'entrée et à la sortie du solveur.
+
+    Les segments tracés forment des chemins : pour chaque extrémité de
+    chemin, bouts donne l'autre extrémité et longueurs le nombre de segments
+    du chemin (un sommet isolé est un chemin de longueur 0). Ces tables sont
+    mises à jour à chaque tracé et restaurées par annule grâce à chemins, ce
+    qui permet de refuser aussitôt un tracé qui ferme une boucle trop tôt.
+
+    Les extrémités ouvertes sont rangées dans paniers selon leur clé, les
+    valeurs des critères LOCAUX qui ouvrent departage : choisit_segment
+    n'applique les critères suivants qu'au plus petit panier. fixe et
+    annule notent seulement dans modifies les sommets dont la clé peut
+    avoir changé (coins des cases touchées), range_ouverts les reclasse.
+
+    Pour éviter qu'un mauvais choix près de la racine ne coûte toute une
+    recherche, solutions procède par tentatives jusqu'à la première
+    solution : chaque tentative dispose d'un budget de NOEUDS_RELANCE
+    nœuds, doublé à chaque relance, au-delà duquel la recherche repart de la
+    racine avec l'ordre de départage suivant (departage puis ceux de
+    relances). Les budgets croissant, une tentative finit par être
+    complète. relances vide donne une seule recherche sans budget.
+
+    observateur est appelé avec ('noeud', None) à chaque nœud (s'il renvoie
+    True la recherche est interrompue), puis avec ('trace', numero),
+    ('interdit', numero) et ('efface', numero) à chaque modification, numero
+    étant le numéro du segment dans la Geometrie de la grille. La
+    recherche est aussi interrompue au-delà de noeuds_max nœuds, ou quand
+    la fonction arret (sans argument, consultée tous les INTERVALLE_ARRET
+    nœuds) renvoie True.
+
+    Avec une TableTransposition, hachage (Zobrist) est tenu à jour à chaque
+    affectation et les nœuds réfutés sont notés dans la table puis sautés.
+    Dans une même tentative un état n'est jamais revu (chaque branchement
+    trace ou interdit un segment) : la table sert d'une tentative à la
+    suivante, ou quand elle est partagée par plusieurs recherches sur la
+    même grille. noeuds, retours et nb_solutions comptent les nœuds
+    visités, les retours en arrière et les solutions données, nb_relances
+    les tentatives abandonnées, elagages les branches abandonnées par
+    cause, profondeur_max est la profondeur maximale atteinte et durees la
+    durée de chaque étape (voir Statistiques).
+
+    >>> recherche = Recherche([['0', None]])
+    >>> recherche.propage(recherche.elements_grille())
+    True
+    >>> recherche.nb_traces, len(recherche.pile)
+    (0, 7)
+    >>> recherche.annule(0)
+    >>> recherche.nb_traces, bytes(recherche.valeurs)
+    (0, b'\\x00\\x00\\x00\\x00\\x00\\x00\\x00')
+    """
+
+    def __init__(self, indices, etat=None, observateur=None, table=None,
+                 departage=DEPARTAGE, noeuds_max=None, arret=None,
+                 relances=RELANCES):
+        for ordre in (departage,) + tuple(relances):
+            for critere in ordre:
+                if critere not in CRITERES:
+                    raise ValueError('critère de départage inconnu : ' +
+                                     str(critere))
+        debut = time.perf_counter()
+        self.ordres = (departage,) + tuple(ordre for ordre in relances
+                                           if ordre != departage)
+        self.noeuds_max = noeuds_max
+        self.arret = arret
+        self.geometrie = geometrie = geometrie_grille(
+            *dimensions_grille(indices))
+        self.indices = [None if indice is None else int(indice)
+                        for ligne in indices for indice in ligne]
+        self.table = table
+        self.cles = None
+        self.hachage = 0
+        if table is not None:
+            self.cles, self.hachage = cles_zobrist(geometrie, self.indices)
+        self.noeuds = 0
+        self.retours = 0
+        self.nb_solutions = 0
+        self.nb_relances = 0
+        self.elagages = dict.fromkeys(ELAGAGES, 0)
+        self.profondeur_max = 0
+        self.durees = dict.fromkeys(ETAPES, 0.0)
+        self.valeurs = bytearray(len(geometrie.segments))
+        self.degres = [0] * len(geometrie.sommets)
+        self.vierges_sommet = [len(autour) for autour
+                               in geometrie.autour_sommet]
+        self.traces_case = [0] * len(self.indices)
+        self.vierges_case = [4] * len(self.indices)
+        self.indices_faux = len([indice for indice in self.indices
+                                 if indice not in (None, 0)])
+        self.nb_traces = 0
+        self.bouts = list(range(len(geometrie.sommets)))
+        self.longueurs = [0] * len(geometrie.sommets)
+        self.ouverts = set()
+        self.ouvert_depuis = [0] * len(geometrie.sommets)
+        self.adopte(departage)
+        self.chemins = []
+        self.queue = None
+        self.pile = []
+        self.observateur = None
+        self.contradiction = False
+        self.interrompue = False
+        if etat is not None:
+            for segment, valeur in etat.items():
+                if segment in geometrie.numeros and not self.fixe(
+                        geometrie.numeros[segment],
+                        TRACE if valeur == 1 else INTERDIT):
+                    self.contradiction = True
+        self.pile = []
+        self.observateur = observateur
+        self.durees['lecture'] = time.perf_counter() - debut
+
+    def fixe(self, numero, valeur):
+        """
+        Trace ou interdit le segment vierge numero et l'empile. Retourne
+        False si le tracé donne un sommet de degré 3 ou ferme une boucle qui
+        ne peut pas être la solution (d'autres segments sont tracés hors de
+        la boucle ou des indices ne sont pas satisfaits), True sinon
+        """
+        geometrie = self.geometrie
+        self.valeurs[numero] = valeur
+        a, b = geometrie.extremites[numero]
+        self.vierges_sommet[a] -= 1
+        self.vierges_sommet[b] -= 1
+        for case in geometrie.cases_segment[numero]:
+            self.vierges_case[case] -= 1
+        possible = True
+        if valeur == TRACE:
+            possible = self.degres[a] < 2 and self.degres[b] < 2
+            if not possible:
+                self.elagages['degre'] += 1
+            self.chemins.append(self.relie(a, b) if possible else None)
+            self.degres[a] += 1
+            self.degres[b] += 1
+            for sommet in a, b:
+                if self.degres[sommet] == 1:
+                    self.ouverts.add(sommet)
+                    self.ouvert_depuis[sommet] = len(self.pile)
+                elif self.degres[sommet] == 2:
+                    self.ouverts.discard(sommet)
+            for case in geometrie.cases_segment[numero]:
+                self.compte_trace(case, 1)
+            self.nb_traces += 1
+            if possible and self.bouts[a] == a:
+                possible = (self.longueurs[a] == self.nb_traces and
+                            self.indices_faux == 0)
+                if not possible:
+                    self.elagages['boucle'] += 1
+        self.pile.append(numero)
+        self.modifies.update(geometrie.coins_segment[numero])
+        if self.cles is not None:
+            self.hachage ^= self.cles[numero][valeur]
+        if self.observateur is not None:
+            self.observateur('trace' if valeur == TRACE else 'interdit',
+                             numero)
+        return possible
+
+    def relie(self, a, b):
+        """
+        Met à jour bouts et longueurs quand le segment a-b relie les chemins
+        dont a et b sont des extrémités, et retourne ce qu'il faut pour
+        annuler. Si a et b sont les deux bouts d'un même chemin, la boucle
+        fermée est notée par bouts[a] == a, longueurs[a] étant sa longueur
+        """
+        bout_a, bout_b = self.bouts[a], self.bouts[b]
+        sauvegarde = (bout_a, self.bouts[bout_a], self.longueurs[bout_a],
+                      bout_b, self.bouts[bout_b], self.longueurs[bout_b])
+        if bout_a == b:
+            self.bouts[a] = a
+            self.longueurs[a] = self.longueurs[a] + 1
+        else:
+            longueur = self.longueurs[a] + self.longueurs[b] + 1
+            self.bouts[bout_a], self.bouts[bout_b] = bout_b, bout_a
+            self.longueurs[bout_a] = self.longueurs[bout_b] = longueur
+        return sauvegarde
+
+    def compte_trace(self, case, nombre):
+        """
+        Ajoute nombre (1 ou -1) aux segments tracés autour de case en tenant
+        à jour indices_faux, le nombre d'indices non satisfaits
+        """
+        indice = self.indices[case]
+        if indice is not None and self.traces_case[case] == indice:
+            self.indices_faux += 1
+        self.traces_case[case] += nombre
+        if indice is not None and self.traces_case[case] == indice:
+            self.indices_faux -= 1
+
+    def annule(self, taille):
+        """
+        Dépile et remet à VIERGE les segments jusqu'à ce que la pile soit de
+        la taille donnée
+        """
+        geometrie = self.geometrie
+        pile = self.pile
+        while len(pile) > taille:
+            numero = pile.pop()
+            a, b = geometrie.extremites[numero]
+            self.vierges_sommet[a] += 1
+            self.vierges_sommet[b] += 1
+            for case in geometrie.cases_segment[numero]:
+                self.vierges_case[case] += 1
+            if self.valeurs[numero] == TRACE:
+                self.degres[a] -= 1
+                self.degres[b] -= 1
+                for sommet in a, b:
+                    if self.degres[sommet] == 1:
+                        self.ouverts.add(sommet)
+                    elif self.degres[sommet] == 0:
+                        self.ouverts.discard(sommet)
+                for case in geometrie.cases_segment[numero]:
+                    self.compte_trace(case, -1)
+                self.nb_traces -= 1
+                sauvegarde = self.chemins.pop()
+                if sauvegarde is not None:
+                    bout_a, ancien_a, longueur_a, bout_b, ancien_b, \
+                        longueur_b = sauvegarde
+                    self.bouts[bout_b] = ancien_b
+                    self.longueurs[bout_b] = longueur_b
+                    self.bouts[bout_a] = ancien_a
+                    self.longueurs[bout_a] = longueur_a
+            self.modifies.update(geometrie.coins_segment[numero])
+            if self.cles is not None:
+                self.hachage ^= self.cles[numero][self.valeurs[numero]]
+            self.valeurs[numero] = VIERGE
+            if self.observateur is not None:
+                self.observateur('efface', numero)
+
+    def elements_grille(self):
+        """
+        Retourne tous les sommets (numéro n) et toutes les cases (~n) de la
+        grille, au format attendu par propage
+        """
+        return (list(range(len(self.degres))) +
+                [~case for case in range(len(self.indices))])
+
+    def propage(self, a_revoir):
+        """
+        Applique les règles de déduction aux sommets (numéro n) et aux cases
+        (~n) de a_revoir jusqu'à un point fixe, en revoyant les éléments
+        touchés par chaque segment décidé :
+
+        - un indice satisfait interdit ses segments vierges (donc tous ceux
+          d'un '0'), un indice qui ne peut l'être qu'en traçant tous ses
+          segments vierges les trace ;
+        - un sommet de degré 2 interdit ses autres segments, un sommet de
+          degré 1 avec un seul segment vierge le trace, un sommet de degré 0
+          avec un seul segment vierge l'interdit ;
+        - le segment qui relie les deux bouts d'un chemin est interdit si
+          d'autres segments sont tracés hors de ce chemin.
+
+        Retourne False si une contradiction est trouvée, True sinon
+
+        :param a_revoir: list
+        :return value: bool
+
+        >>> recherche = Recherche([['3', '0']])
+        >>> recherche.propage(recherche.elements_grille())
+        False
+        """
+        geometrie = self.geometrie
+        valeurs = self.valeurs
+        a_revoir = list(a_revoir)
+        while a_revoir:
+            element = a_revoir.pop()
+            if element >= 0:
+                degre = self.degres[element]
+                vierges = self.vierges_sommet[element]
+                autour = geometrie.autour_sommet[element]
+                if degre > 2 or (degre == 1 and vierges == 0):
+                    self.elagages['degre'] += 1
+                    return False
+                elif vierges and (degre == 2 or (degre == 0 and
+                                                 vierges == 1)):
+                    valeur = INTERDIT
+                    segments = [numero for numero, _ in autour]
+                elif degre == 1 and vierges == 1:
+                    valeur = TRACE
+                    segments = [numero for numero, _ in autour]
+                elif degre == 1 and \
+                        self.longueurs[element] < self.nb_traces:
+                    valeur = INTERDIT
+                    segments = [numero for numero, autre in autour
+                                if autre == self.bouts[element]]
+                else:
+                    continue
+            else:
+                indice = self.indices[~element]
+                if indice is None:
+                    continue
+                traces = self.traces_case[~element]
+                vierges = self.vierges_case[~element]
+                if traces > indice or traces + vierges < indice:
+                    self.elagages['indice'] += 1
+                    return False
+                elif vierges and traces == indice:
+                    valeur = INTERDIT
+                elif vierges and traces + vierges == indice:
+                    valeur = TRACE
+                else:
+                    continue
+                segments = geometrie.autour_case[~element]
+            for numero in segments:
+                if valeurs[numero] == VIERGE:
+                    a, b = geometrie.extremites[numero]
+                    if valeur == TRACE:
+                        a_revoir.extend((self.bouts[a], self.bouts[b]))
+                    if not self.fixe(numero, valeur):
+                        return False
+                    a_revoir.extend((a, b))
+                    a_revoir.extend([~case for case
+                                     in geometrie.cases_segment[numero]])
+        return True
+
+    def decide(self, numero, valeur):
+        """
+        Trace ou interdit le segment vierge numero puis propage les
+        déductions autour de lui, retourne False en cas de contradiction
+
+        :param numero: int
+        :param valeur: int
+        :return value: bool
+        """
+        geometrie = self.geometrie
+        a, b = geometrie.extremites[numero]
+        a_revoir = [a, b] + [~case for case in geometrie.cases_segment[numero]]
+        if valeur == TRACE:
+            a_revoir += [self.bouts[a], self.bouts[b]]
+        return self.fixe(numero, valeur) and self.propage(a_revoir)
+
+    def critere_sommet(self, critere, sommet):
+        """
+        Retourne la valeur du critère de départage critere pour l'extrémité
+        de chemin sommet, la plus petite étant la plus contrainte
+        """
+        if critere == 'suivi':
+            return 0 if sommet == self.tete() else 1
+        elif critere == 'options':
+            return self.vierges_sommet[sommet]
+        elif critere == 'indices':
+            facons = 7
+            for case in self.geometrie.cases_sommet[sommet]:
+                facons = min(facons, self.facons_case(case))
+            return facons
+        elif critere == 'longueur':
+            return -self.longueurs[sommet]
+        elif critere == 'recent':
+            return -self.ouvert_depuis[sommet]
+        return sommet
+
+    def tete(self):
+        """
+        Retourne le sommet depuis lequel prolonger le chemin suivi : l'autre
+        extrémité du chemin dont queue est une extrémité, ou queue lui-même
+        s'il reste à en partir. Retourne None s'il n'y a pas de chemin suivi
+        (début de la recherche, ou chemin absorbé par la propagation)
+
+        :return value: int
+        """
+        queue = self.queue
+        if queue is not None:
+            if self.degres[queue] == 1:
+                return self.bouts[queue]
+            if self.degres[queue] == 0 and self.vierges_sommet[queue]:
+                return queue
+        return None
+
+    def sommet_depart(self):
+        """
+        Retourne le sommet d'où partir quand il n'y a pas de chemin suivi :
+        le premier coin non saturé d'une case d'indice 3, puis 2, puis 1,
+        puis sans indice, ou None
+
+        :return value: int
+        """
+        geometrie = self.geometrie
+        for indice in (3, 2, 1, None):
+            for case, indice_case in enumerate(self.indices):
+                if indice_case == indice:
+                    x, y = divmod(case, geometrie.largeur)
+                    for a, b in ((x, y), (x, y+1), (x+1, y), (x+1, y+1)):
+                        sommet = geometrie.numero_sommet(a, b)
+                        if self.degres[sommet] < 2 and \
+                                self.vierges_sommet[sommet]:
+                            return sommet
+        return None
+
+    def facons_case(self, case):
+        """
+        Retourne le nombre de façons de satisfaire l'indice de case avec ses
+        segments vierges (7, plus que tout indice, si case n'a pas d'indice
+        ou plus de segment vierge)
+        """
+        indice = self.indices[case]
+        vierges = self.vierges_case[case]
+        if indice is None or vierges == 0:
+            return 7
+        return comb(vierges, max(0, indice - self.traces_case[case]))
+
+    def adopte(self, departage):
+        """
+        Adopte l'ordre de départage departage : les paniers sont vidés et
+        toutes les extrémités ouvertes seront rangées selon leurs nouvelles
+        clés au prochain range_ouverts
+
+        :param departage: tuple
+        """
+        self.departage = departage
+        self.queue = None
+        self.locaux = 0
+        while self.locaux < len(departage) and \
+                departage[self.locaux] in LOCAUX:
+            self.locaux += 1
+        self.paniers = {}
+        self.cles_ouverts = [None] * len(self.geometrie.sommets)
+        self.modifies = set(self.ouverts)
+
+    def range_ouverts(self):
+        """
+        Range dans paniers, selon leur clé, les extrémités de chemin parmi
+        les sommets de modifies, et retire des paniers ceux qui ne sont plus
+        des extrémités
+        """
+        paniers = self.paniers
+        cles = self.cles_ouverts
+        locaux = self.departage[:self.locaux]
+        for sommet in self.modifies:
+            ancienne = cles[sommet]
+            nouvelle = None
+            if self.degres[sommet] == 1:
+                nouvelle = tuple([self.critere_sommet(critere, sommet)
+                                  for critere in locaux])
+            if nouvelle != ancienne:
+                if ancienne is not None:
+                    panier = paniers[ancienne]
+                    panier.discard(sommet)
+                    if not panier:
+                        del paniers[ancienne]
+                if nouvelle is not None:
+                    paniers.setdefault(nouvelle, set()).add(sommet)
+                cles[sommet] = nouvelle
+        self.modifies.clear()
+
+    def choisit_segment(self):
+        """
+        Retourne le segment vierge le plus contraint, sur lequel brancher,
+        ou None s'il n'en reste aucun. S'il y a des chemins, c'est le premier
+        segment vierge de l'extrémité retenue par les critères de departage
+        appliqués l'un après l'autre aux extrémités encore à égalité (puis
+        par le plus petit numéro), sinon celui de l'indice qui laisse le
+        moins de façons d'être satisfait, sinon le premier segment vierge.
+        Les critères locaux sont déjà appliqués par les paniers. Quand
+        departage commence par 'suivi', c'est la tête du chemin suivi, ou
+        sans chemin, sommet_depart. queue devient l'autre extrémité du
+        chemin de l'extrémité retenue
+
+        :return value: int
+        """
+        geometrie = self.geometrie
+        valeurs = self.valeurs
+        sommet = None
+        if self.departage[0] == 'suivi':
+            sommet = self.tete()
+            if sommet is None and not self.ouverts:
+                sommet = self.sommet_depart()
+        if sommet is None and self.ouverts:
+            self.range_ouverts()
+            candidats = list(self.paniers[min(self.paniers)])
+            for critere in self.departage[self.locaux:]:
+                if len(candidats) == 1:
+                    break
+                notes = [self.critere_sommet(critere, sommet)
+                         for sommet in candidats]
+                meilleure = min(notes)
+                candidats = [sommet for sommet, note in zip(candidats, notes)
+                             if note == meilleure]
+            sommet = min(candidats)
+        if sommet is not None:
+            self.queue = self.bouts[sommet]
+            for numero, _ in geometrie.autour_sommet[sommet]:
+                if valeurs[numero] == VIERGE:
+                    return numero
+        meilleure, facons = None, 7
+        for case in range(len(self.indices)):
+            if self.facons_case(case) < facons:
+                meilleure, facons = case, self.facons_case(case)
+        if meilleure is not None:
+            for numero in geometrie.autour_case[meilleure]:
+                if valeurs[numero] == VIERGE:
+                    return numero
+        if VIERGE in valeurs:
+            return valeurs.index(VIERGE)
+        return None
+
+    def solutions(self):
+        """
+        Générateur : propage les déductions sur toute la grille puis explore
+        l'arbre de recherche. À chaque nœud, le segment le plus contraint
+        (choisit_segment) est d'abord tracé puis interdit, et les déductions
+        sont propagées. fixe refuse les boucles qui ferment trop tôt, donc
+        dès qu'il n'y a plus d'extrémité de chemin, les segments tracés
+        forment la solution. Donne True pour chaque solution, l'état courant
+        étant alors la solution. À la fin, l'état initial est rétabli (sauf
+        si l'observateur a interrompu la recherche).
+
+        Tant qu'aucune solution n'est trouvée, une tentative qui dépasse son
+        budget est abandonnée et l'arbre est repris depuis l'état obtenu par
+        la propagation initiale avec l'ordre de départage suivant (voir
+        RELANCES). Dès la première solution, la tentative en cours n'a plus
+        de budget : la suite de l'arbre (autres solutions, preuve
+        d'unicité) est explorée une seule fois, et chaque solution n'est
+        donnée qu'une fois.
+
+        La recherche n'est pas récursive : branches contient, pour chaque
+        segment en cours d'essai tracé, le segment, la taille de la pile
+        avant le tracé, la clé du nœud dans la table de transposition, les
+        nombres de solutions et de nœuds à son entrée, puis queue (voir
+        choisit_segment), rétablie au retour. Avec une table,
+        un nœud dont le segment a été interdit reste dans branches (segment
+        None) jusqu'à la fin de sa recherche pour y être noté s'il est
+        réfuté. Une tentative abandonnée ne note rien pour les nœuds
+        qu'elle n'a pas finis
+
+        >>> recherche = Recherche([[None] * 4] * 4)
+        >>> sum(1 for _ in recherche.solutions()), recherche.nb_relances
+        (9349, 0)
+        """
+        table = self.table
+        debut = time.perf_counter()
+        possible = not self.contradiction and \
+            self.propage(self.elements_grille())
+        fin = time.perf_counter()
+        self.durees['propagation'] += fin - debut
+        if not possible:
+            self.annule(0)
+            return
+        debut = fin
+        racine = len(self.pile)
+        ordres = self.ordres
+        tentative = 0
+        if self.departage != ordres[0]:
+            self.adopte(ordres[0])
+        limite = None
+        if len(ordres) > 1:
+            limite = self.noeuds + NOEUDS_RELANCE
+        branches = []
+        while True:
+            self.noeuds += 1
+            if self.arrete():
+                self.interrompue = True
+                self.durees['recherche'] += time.perf_counter() - debut
+                return
+            if limite is not None and self.noeuds > limite:
+                # Tentative trop longue : on repart de la racine avec l'ordre
+                # suivant et un budget doublé
+                self.annule(racine)
+                del branches[:]
+                self.nb_relances += 1
+                tentative += 1
+                self.adopte(ordres[tentative % len(ordres)])
+                limite = self.noeuds + (NOEUDS_RELANCE << tentative)
+            numero = cle = None
+            if self.nb_traces and not self.ouverts:
+                limite = None
+                self.nb_solutions += 1
+                self.durees['recherche'] += time.perf_counter() - debut
+                yield True
+                debut = time.perf_counter()
+            else:
+                if table is not None:
+                    cle = self.hachage
+                if table is None or cle not in table:
+                    numero = self.choisit_segment()
+            if numero is not None:
+                branches.append((numero, len(self.pile), cle,
+                                 self.nb_solutions, self.noeuds, self.queue))
+                if len(branches) > self.profondeur_max:
+                    self.profondeur_max = len(branches)
+                if self.decide(numero, TRACE):
+                    continue
+            # Toutes les solutions de la branche courante ont été vues : on
+            # remonte jusqu'au dernier segment tracé qui peut être interdit
+            self.retours += 1
+            while branches:
+                numero, taille, cle, solutions, noeuds, queue = \
+                    branches.pop()
+                self.annule(taille)
+                self.queue = queue
+                if numero is not None:
+                    if self.decide(numero, INTERDIT):
+                        if table is not None:
+                            branches.append((None, taille, cle, solutions,
+                                             noeuds, queue))
+                        break
+                if table is not None and self.nb_solutions == solutions:
+                    table.ajoute(cle, self.noeuds - noeuds)
+            else:
+                self.annule(0)
+                self.durees['recherche'] += time.perf_counter() - debut
+                return
+
+    def arrete(self):
+        """
+        Indique si la recherche doit être interrompue au nœud qu'elle vient
+        de commencer : observateur, noeuds_max ou arret
+
+        :return value: bool
+
+        >>> recherche = Recherche([[None] * 4] * 4, noeuds_max=5)
+        >>> recherche.selectionne_sommet(), recherche.noeuds
+        (None, 6)
+        """
+        if self.observateur is not None and self.observateur('noeud', None):
+            return True
+        if self.noeuds_max is not None and self.noeuds > self.noeuds_max:
+            return True
+        return self.arret is not None and \
+            self.noeuds % INTERVALLE_ARRET == 0 and self.arret()
+
+    def selectionne_sommet(self):
+        """
+        Cherche une solution, l'état courant devient cette solution. Retourne
+        True si une solution est trouvée, None si la recherche est
+        interrompue, False sinon (l'état initial est alors rétabli)
+
+        :return value: bool
+        """
+        for _ in self.solutions():
+            return True
+        if self.interrompue:
+            return None
+        return False
+
+    def vers_etat(self, etat, interdits=True):
+        """
+        Écrit dans etat les segments tracés (1) et, si interdits vaut True,
+        les segments interdits (-1), puis retourne etat
+
+        :param etat: dict
+        :param interdits: bool
+        :return value: dict
+        """
+        for numero, valeur in enumerate(self.valeurs):
+            if valeur == TRACE:
+                etat[self.geometrie.segments[numero]] = 1
+            elif valeur == INTERDIT and interdits:
+                etat[self.geometrie.segments[numero]] = -1
+        return etat
+
+
+def selectionne_sommet(etat, indices, observateur=None, statistiques=None):
+    """
+    Lance le solveur sur la grille en partant de etat. Si une solution est
+    trouvée (ou si la recherche est interrompue), les segments tracés et
+    interdits sont recopiés dans etat. Retourne True si une solution est
+    trouvée, None si la recherche est interrompue, False sinon. L'objet
+    Statistiques éventuel reçoit le bilan de la recherche
+
+    :param etat: dict
+    :param indices: list
+    :param observateur: function
+    :param statistiques: Statistiques
+    :return value: bool
+
+    >>> etat = {}
+    >>> selectionne_sommet(etat, [['2', '2'], ['2', '2']])
+    True
+    >>> nombre_segments(etat)
+    8
+    """
+    recherche = Recherche(indices, etat, observateur)
+    resultat = recherche.selectionne_sommet()
+    if statistiques is not None:
+        statistiques.releve(recherche)
+    if resultat is not False:
+        recherche.vers_etat(etat)
+    return resultat
+
+
+def solve(indices, etat=None, methode='recherche', table=None, cache=None):
+    """
+    Résout la grille sans interface graphique et sans scruter d'évènements.
+    Retourne un nouvel etat contenant la boucle trouvée, ou None si la grille
+    n'a pas de solution. etat (non modifié) permet de partir d'une partie
+    commencée. methode choisit le moteur : 'recherche' (déductions et retour
+    en arrière) ou 'sat' (encodage CNF et solveur CDCL du module sat). table
+    est une TableTransposition éventuelle pour la recherche. cache est une
+    base cache.CacheSolutions consultée avant de chercher et complétée avec
+    le résultat
+
+    :param indices: list
+    :param etat: dict
+    :param methode: str
+    :param table: TableTransposition
+    :param cache: CacheSolutions
+    :return value: dict
+
+    >>> solution = solve([['2', '2'], ['2', '2']])
+    >>> nombre_segments(solution)
+    8
+    >>> solve([['2', '2'], ['2', '2']], methode='sat') == solution
+    True
+    >>> solve([['0']]) is None
+    True
+    """
+    if cache is not None:
+        connue = cache.cherche(indices, etat)
+        if connue is not None:
+            return connue[0]
+    if methode == 'sat':
+        import sat
+        debut = time.perf_counter()
+        solution = sat.resoudre_sat(indices, etat)
+        statistiques = Statistiques()
+        statistiques.durees['recherche'] = time.perf_counter() - debut
+    else:
+        solution, statistiques = solve_stats(indices, etat, table)
+    if cache is not None:
+        cache.enregistre(indices, solution, statistiques.vers_dict(), etat)
+    return solution
+
+
+def solve_stats(indices, etat=None, table=None, memoire=False, profil=None):
+    """
+    Comme solve avec la recherche, mais retourne le couple (solution,
+    statistiques), statistiques étant le bilan (Statistiques) de la
+    résolution. Si memoire vaut True, la mémoire maximale est mesurée avec
+    tracemalloc (ce qui ralentit la recherche). Si profil est un nom de
+    fichier, la résolution est profilée avec cProfile et le profil y est
+    écrit (à lire avec le module pstats)
+
+    :param indices: list
+    :param etat: dict
+    :param table: TableTransposition
+    :param memoire: bool
+    :param profil: str
+    :return value: tuple
+
+    >>> solution, statistiques = solve_stats([['2', '2'], ['2', '2']])
+    >>> nombre_segments(solution), statistiques.solutions
+    (8, 1)
+    >>> solve_stats([['3', '0']], memoire=True)[1].memoire > 0
+    True
+    """
+    mesure = memoire and not tracemalloc.is_tracing()
+    if mesure:
+        tracemalloc.start()
+    elif memoire:
+        tracemalloc.reset_peak()
+    profileur = None
+    if profil is not None:
+        profileur = cProfile.Profile()
+        profileur.enable()
+    try:
+        solution = None
+        recherche = Recherche(indices, etat, table=table)
+        if recherche.selectionne_sommet() is True:
+            solution = recherche.vers_etat(Etat(), interdits=False)
+    finally:
+        if profileur is not None:
+            profileur.disable()
+            profileur.dump_stats(profil)
+        pic = tracemalloc.get_traced_memory()[1] if memoire else None
+        if mesure:
+            tracemalloc.stop()
+    statistiques = Statistiques(recherche)
+    statistiques.memoire = pic
+    return solution, statistiques
+
+
+def iter_solutions(indices, etat=None, table=None):
+    """
+    Générateur donnant, au fur et à mesure que la recherche les trouve,
+    chaque solution de la grille (un Etat ne contenant que la boucle), une
+    seule fois chacune. etat (non modifié) permet de partir d'une partie
+    commencée
+
+    :param indices: list
+    :param etat: dict
+    :param table: TableTransposition
+
+    >>> [nombre_segments(sol) for sol in iter_solutions([[None, None]])]
+    [6, 4, 4]
+    """
+    recherche = Recherche(indices, etat, table=table)
+    for _ in recherche.solutions():
+        yield recherche.vers_etat(Etat(), interdits=False)
+
+
+def count_solutions(indices, limit=2, etat=None, table=None, noeuds_max=None):
+    """
+    Compte les solutions de la grille en s'arrêtant dès que limit est
+    atteint (None pour toutes les compter). Avec la valeur par défaut, 1
+    signifie que la solution est unique. Une TableTransposition partagée
+    avec une recherche précédente sur la même grille évite de refaire les
+    branches qu'elle a réfutées. Retourne None si la recherche dépasse
+    noeuds_max nœuds avant d'avoir atteint limit
+
+    :param indices: list
+    :param limit: int
+    :param etat: dict
+    :param table: TableTransposition
+    :param noeuds_max: int
+    :return value: int
+
+    >>> count_solutions([['2', '2'], ['2', '2']])
+    1
+    >>> count_solutions([[None, None], [None, None]], limit=None)
+    13
+    >>> count_solutions([['3', '0']])
+    0
+    >>> count_solutions([[None] * 4] * 4, None, noeuds_max=5) is None
+    True
+    """
+    recherche = Recherche(indices, etat, table=table, noeuds_max=noeuds_max)
+    nombre = 0
+    for _ in recherche.solutions():
+        nombre += 1
+        if limit is not None and nombre >= limit:
+            return nombre
+    if recherche.interrompue:
+        return None
+    return nombre
+
+
+def lit_grille(lignes):
+    """
+    Lit un fichier de grille (ou toute suite de lignes) au format du
+    dossier "grilles" : une ligne par rangée de cases ('_' pour une case
+    sans indice), puis éventuellement l'état d'une partie en cours ('{...}')
+    et son temps ('[...]'). Retourne le triplet (grille, etat, temps)
+
+    :param lignes: iterable
+    :return value: tuple
+
+    >>> grille, etat, temps = lit_grille(['2_\\n', "{((0, 0), (0, 1)): 1}\\n"])
+    >>> grille, len(etat), temps
+    (['2_\\n'], 1, [0, 0])
+    """
+    grille = []
+    etat = Etat()
+    temps = [0, 0]
+    for line in lignes:
+        if line[:1] != '{' and line[:1] != '[':
+            grille.append(line)
+        elif line[:1] == '[':
+            temps = ast.literal_eval(line)
+        else:
+            etat = Etat(ast.literal_eval(line))
+    return grille, etat, temps
+
+
+def indices_grille(grille):
+    """
+    Retourne la liste des indices d'une grille lue par lit_grille : le
+    chiffre de chaque case, ou None pour une case sans indice. Lève
+    ValueError si la grille est vide ou n'est pas rectangulaire
+
+    :param grille: list
+    :return value: list
+
+    >>> indices_grille(['2_\\n', '_3\\n'])
+    [['2', None], [None, '3']]
+    >>> indices_grille(['2_\\n', '3\\n'])
+    Traceback (most recent call last):
+    ...
+    ValueError: grille non rectangulaire : ligne 2 de 1 cases au lieu de 2
+    """
+    indices = []
+    for ligne in grille:
+        ligne = ligne.rstrip('\n')
+        if ligne:
+            indices.append([None if car == '_' else car for car in ligne])
+    dimensions_grille(indices)
+    return indices
+
+
+def dimensions_grille(indices):
+    """
+    Retourne le couple (hauteur, largeur) de la grille. Lève ValueError si
+    elle est vide ou si ses lignes n'ont pas toutes la même longueur
+
+    :param indices: list
+    :return value: tuple
+
+    >>> dimensions_grille([['2', None], [None, '3'], ['1', '1']])
+    (3, 2)
+    >>> solve([['2', None], [None]])
+    Traceback (most recent call last):
+    ...
+    ValueError: grille non rectangulaire : ligne 2 de 1 cases au lieu de 2
+    >>> dimensions_grille([])
+    Traceback (most recent call last):
+    ...
+    ValueError: grille vide
+    """
+    if not indices or not indices[0]:
+        raise ValueError('grille vide')
+    largeur = len(indices[0])
+    for numero, ligne in enumerate(indices, 1):
+        if len(ligne) != largeur:
+            raise ValueError('grille non rectangulaire : ligne %d de %d cases '
+                             'au lieu de %d' % (numero, len(ligne), largeur))
+    return len(indices), largeur
+
+
+if __name__ == '__main__':
+    testmod()
@@ -0,0 +1,153 @@
+##############################################################################
+#                                                                            #
+#                   Projet Slitherlink - Résolution parallèle                #
+#                                                                            #
+##############################################################################
+
+# L'arbre de recherche est développé sur quelques niveaux en branchant sur
+# les segments les plus contraints (tracé ou interdit), puis chaque sous-arbre
+# est résolu dans un processus séparé. Dès qu'un processus trouve une
+# solution, les sous-arbres en attente sont annulés et les recherches en
+# cours sont interrompues.
+
+
+import os
+import multiprocessing
+from concurrent.futures import ProcessPoolExecutor, as_completed
+from doctest import testmod
+from moteur import Etat, Recherche, TRACE, INTERDIT
+
+
+_arret = None
+
+
+def decoupe(indices, etat=None, profondeur=3):
+    """
+    Développe l'arbre de recherche sur profondeur niveaux en branchant,
+    comme la recherche, sur le segment le plus contraint (tracé puis
+    interdit) après propagation des déductions. Retourne la liste des
+    sous-arbres non contradictoires, chacun étant le dict des segments
+    décidés (1 tracé, -1 interdit) qui le définit. Les sous-arbres forment
+    une partition : chaque solution est dans exactement l'un d'eux
+
+    :param indices: list
+    :param etat: dict
+    :param profondeur: int
+    :return value: list
+
+    >>> len(decoupe([[None, None], [None, None]], profondeur=2))
+    4
+    >>> decoupe([['3', '0']])
+    []
+    """
+    recherche = Recherche(indices, etat)
+    sous_arbres = []
+    if not recherche.contradiction and \
+            recherche.propage(recherche.elements_grille()):
+        developpe(recherche, profondeur, {}, sous_arbres)
+    return sous_arbres
+
+
+def developpe(recherche, profondeur, decisions, sous_arbres):
+    """
+    Ajoute à sous_arbres les sous-arbres de l'état courant de recherche,
+    decisions étant les segments déjà décidés pour y arriver
+
+    :param recherche: Recherche
+    :param profondeur: int
+    :param decisions: dict
+    :param sous_arbres: list
+    """
+    numero = None
+    if profondeur > 0 and (not recherche.nb_traces or recherche.ouverts):
+        numero = recherche.choisit_segment()
+    if numero is not None:
+        segment = recherche.geometrie.segments[numero]
+        for valeur in (TRACE, INTERDIT):
+            taille = len(recherche.pile)
+            if recherche.decide(numero, valeur):
+                decisions[segment] = 1 if valeur == TRACE else -1
+                developpe(recherche, profondeur - 1, decisions, sous_arbres)
+                del decisions[segment]
+            recherche.annule(taille)
+    else:
+        sous_arbres.append(dict(decisions))
+
+
+def initialise(evenement):
+    """
+    Initialise un processus de calcul avec le signal d'arrêt partagé
+    """
+    global _arret
+    _arret = evenement
+
+
+def resout_sous_arbre(indices, etat, decisions):
+    """
+    Résout le sous-arbre défini par decisions dans un processus de calcul.
+    La recherche s'interrompt si un autre processus a trouvé une solution.
+    Retourne le dict des segments de la boucle, ou None
+
+    :param indices: list
+    :param etat: dict
+    :param decisions: dict
+    :return value: dict
+    """
+    hypotheses = dict(etat or {})
+    hypotheses.update(decisions)
+    recherche = Recherche(indices, hypotheses, arret=None if _arret is None
+                          else _arret.is_set)
+    if recherche.selectionne_sommet() is True:
+        if _arret is not None:
+            _arret.set()
+        return recherche.vers_etat({}, interdits=False)
+    return None
+
+
+def solve_parallel(indices, etat=None, processus=None, profondeur=None):
+    """
+    Résout la grille en répartissant les sous-arbres de decoupe sur un
+    groupe de processus (os.cpu_count() par défaut). La profondeur par
+    défaut donne environ quatre sous-arbres par processus. Retourne le
+    couple (solution, sous-arbre) où solution est un Etat contenant la
+    boucle et sous-arbre le dict des décisions du sous-arbre qui l'a
+    trouvée, ou (None, None) si la grille n'a pas de solution
+
+    :param indices: list
+    :param etat: dict
+    :param processus: int
+    :param profondeur: int
+    :return value: tuple
+
+    >>> solution, sous_arbre = solve_parallel([['2', '2'], ['2', '2']],
+    ...                                       None, 2)
+    >>> len(solution)
+    8
+    >>> solve_parallel([['3', '0']], processus=2)
+    (None, None)
+    """
+    if processus is None:
+        processus = os.cpu_count() or 1
+    if profondeur is None:
+        profondeur = max(1, (4 * processus - 1).bit_length())
+    sous_arbres = decoupe(indices, etat, profondeur)
+    if not sous_arbres:
+        return None, None
+    evenement = multiprocessing.Event()
+    with ProcessPoolExecutor(processus, initializer=initialise,
+                             initargs=(evenement,)) as executeur:
+        taches = {executeur.submit(resout_sous_arbre, indices, etat,
+                                   decisions): decisions
+                  for decisions in sous_arbres}
+        for tache in as_completed(taches):
+            solution = tache.result()
+            if solution is not None:
+                evenement.set()
+                for autre in taches:
+                    autre.cancel()
+                return Etat(solution), taches[tache]
+    return None, None
+
+
+if __name__ == '__main__':
+    testmod()
@@ -0,0 +1,297 @@
+##############################################################################
+#                                                                            #
+#                   Projet Slitherlink - Sauvegarde des parties              #
+#                                                                            #
+##############################################################################
+
+# Une partie en cours est sauvegardée dans deux fichiers :
+#
+# - un instantané binaire : un en-tête (dimensions, temps de jeu), les
+#   indices de la grille, puis l'état de chaque segment sur 2 bits, dans
+#   l'ordre de la numérotation de moteur.Geometrie ;
+# - un journal (même nom suivi de .jnl) auquel chaque coup est ajouté dès
+#   qu'il est joué : temps de jeu, action et numéro du segment.
+#
+# La partie est l'instantané suivi des coups du journal : un arrêt brutal ne
+# perd donc aucun coup. Tous les COMPACTAGE coups, et à la fin de la partie,
+# l'instantané est réécrit (fichier temporaire puis remplacement) et le
+# journal est vidé. Instantané et journal portent le même jeton aléatoire :
+# un journal qui ne correspond pas à l'instantané (arrêt entre les deux
+# écritures) est ignoré, ses coups étant déjà dans l'instantané.
+
+
+import os
+import struct
+from doctest import testmod
+from moteur import Etat, geometrie_grille, indices_grille
+
+
+VERSION = 1
+
+# Nombre de coups du journal au-delà duquel l'instantané est réécrit
+COMPACTAGE = 256
+
+# Actions du journal, dans l'ordre de leur code, et valeur correspondante du
+# segment dans etat (0 : segment absent de etat)
+ACTIONS = ('efface', 'trace', 'interdit')
+VALEURS = (0, 1, -1)
+
+# En-tête de l'instantané : magique, version, lignes, colonnes, temps de jeu
+# en secondes, jeton
+EN_TETE = struct.Struct('<4sBHHI4s')
+MAGIQUE = b'SLKP'
+
+# En-tête du journal (magique, jeton), puis un coup : temps de jeu en
+# secondes, code de l'action, numéro du segment
+EN_TETE_JOURNAL = struct.Struct('<4s4s')
+MAGIQUE_JOURNAL = b'SLKJ'
+COUP = struct.Struct('<dBI')
+
+
+def compresse_etat(etat, geometrie):
+    """
+    Retourne l'état des segments de la géométrie sur 2 bits chacun, quatre
+    par octet : 0 pour un segment libre, 1 tracé, 2 interdit
+
+    :param etat: dict
+    :param geometrie: moteur.Geometrie
+    :return value: bytes
+
+    >>> geometrie = geometrie_grille(1, 1)
+    >>> compresse_etat({((0, 0), (0, 1)): 1, ((1, 0), (1, 1)): -1},
+    ...                geometrie).hex()
+    '81'
+    """
+    donnees = bytearray((len(geometrie.segments) + 3) // 4)
+    for segment, valeur in etat.items():
+        numero = geometrie.numeros[segment]
+        donnees[numero >> 2] |= (1 if valeur == 1 else 2) << 2 * (numero & 3)
+    return bytes(donnees)
+
+
+def decompresse_etat(donnees, geometrie):
+    """
+    Retourne l'Etat codé par compresse_etat
+
+    :param donnees: bytes
+    :param geometrie: moteur.Geometrie
+    :return value: Etat
+
+    >>> geometrie = geometrie_grille(1, 1)
+    >>> decompresse_etat(bytes.fromhex('81'), geometrie)
+    {((0, 0), (0, 1)): 1, ((1, 0), (1, 1)): -1}
+    """
+    etat = Etat()
+    segments = geometrie.segments
+    for octet, valeurs in enumerate(donnees):
+        numero = octet << 2
+        while valeurs:
+            if valeurs & 3:
+                etat[segments[numero]] = 1 if valeurs & 3 == 1 else -1
+            valeurs >>= 2
+            numero += 1
+    return etat
+
+
+def secondes_temps(temps):
+    """
+    Retourne en secondes le temps [minutes, secondes] du jeu
+
+    :param temps: list
+    :return value: int
+
+    >>> secondes_temps(['01', '05'])
+    65
+    """
+    return int(temps[0]) * 60 + int(temps[1])
+
+
+def ecrit_partie(chemin, grille, etat, secondes):
+    """
+    Écrit l'instantané de la partie (grille au format du dossier "grilles",
+    etat et temps de jeu en secondes) et vide son journal. L'instantané
+    précédent n'est remplacé qu'une fois le nouveau entièrement écrit
+
+    :param chemin: str
+    :param grille: list
+    :param etat: dict
+    :param secondes: float
+    """
+    indices = indices_grille(grille)
+    geometrie = geometrie_grille(len(indices), len(indices[0]))
+    jeton = os.urandom(4)
+    temporaire = chemin + '.tmp'
+    with open(temporaire, 'wb') as f:
+        f.write(EN_TETE.pack(MAGIQUE, VERSION, geometrie.hauteur,
+                             geometrie.largeur, int(secondes), jeton))
+        f.write(''.join('_' if indice is None else indice
+                        for ligne in indices for indice in ligne).encode())
+        f.write(compresse_etat(etat, geometrie))
+        f.flush()
+        os.fsync(f.fileno())
+    os.replace(temporaire, chemin)
+    with open(chemin + '.jnl', 'wb') as f:
+        f.write(EN_TETE_JOURNAL.pack(MAGIQUE_JOURNAL, jeton))
+
+
+def lit_partie(chemin):
+    """
+    Lit la partie sauvegardée : l'instantané, puis les coups complets de
+    son journal. Retourne le triplet (grille, etat, temps) comme
+    moteur.lit_grille, temps étant [minutes, secondes]. Lève ValueError si
+    le fichier n'est pas une partie sauvegardée
+
+    :param chemin: str
+    :return value: tuple
+
+    >>> import tempfile
+    >>> with tempfile.TemporaryDirectory() as dossier:
+    ...     chemin = os.path.join(dossier, 'partie')
+    ...     etat = {}
+    ...     journal = Journal(chemin, ['2_\\n', '_3\\n'], etat, 60)
+    ...     etat[((0, 0), (0, 1))] = 1
+    ...     journal.note(etat, 0, 61.5)
+    ...     etat[((0, 1), (0, 2))] = -1
+    ...     journal.note(etat, 2, 62)
+    ...     del etat[((0, 0), (0, 1))]
+    ...     journal.note(etat, 0, 125)
+    ...     lit_partie(chemin)
+    ...     journal.ferme(etat, 130)
+    ...     lit_partie(chemin)
+    (['2_\\n', '_3\\n'], {((0, 1), (0, 2)): -1}, [2, 5])
+    (['2_\\n', '_3\\n'], {((0, 1), (0, 2)): -1}, [2, 10])
+    """
+    with open(chemin, 'rb') as f:
+        donnees = f.read()
+    if len(donnees) < EN_TETE.size:
+        raise ValueError(chemin + " n'est pas une partie sauvegardée")
+    magique, version, lignes, colonnes, secondes, jeton = \
+        EN_TETE.unpack_from(donnees)
+    if magique != MAGIQUE or version != VERSION:
+        raise ValueError(chemin + " n'est pas une partie sauvegardée")
+    debut = EN_TETE.size
+    texte = donnees[debut:debut + lignes * colonnes].decode()
+    grille = [texte[i * colonnes:(i + 1) * colonnes] + '\n'
+              for i in range(lignes)]
+    geometrie = geometrie_grille(lignes, colonnes)
+    etat = decompresse_etat(donnees[debut + lignes * colonnes:], geometrie)
+    try:
+        with open(chemin + '.jnl', 'rb') as f:
+            journal = f.read()
+    except FileNotFoundError:
+        journal = b''
+    if journal[:EN_TETE_JOURNAL.size] == EN_TETE_JOURNAL.pack(
+            MAGIQUE_JOURNAL, jeton):
+        fin = len(journal) - (len(journal) - EN_TETE_JOURNAL.size) \
+            % COUP.size
+        for temps, code, numero in COUP.iter_unpack(
+                journal[EN_TETE_JOURNAL.size:fin]):
+            segment = geometrie.segments[numero]
+            if VALEURS[code]:
+                etat[segment] = VALEURS[code]
+            else:
+                etat.pop(segment, None)
+            secondes = max(secondes, int(temps))
+    return grille, etat, list(divmod(secondes, 60))
+
+
+def action_segment(etat, segment):
+    """
+    Retourne l'action du journal qui donne à segment sa valeur dans etat
+
+    :param etat: dict
+    :param segment: tuple
+    :return value: str
+
+    >>> action_segment({((0, 0), (0, 1)): -1}, ((0, 0), (0, 1)))
+    'interdit'
+    >>> action_segment({}, ((0, 0), (0, 1)))
+    'efface'
+    """
+    return ACTIONS[VALEURS.index(etat.get(segment, 0))]
+
+
+def efface_partie(chemin):
+    """
+    Supprime la partie sauvegardée et son journal s'ils existent
+
+    :param chemin: str
+    """
+    for fichier in (chemin, chemin + '.jnl'):
+        if os.path.exists(fichier):
+            os.remove(fichier)
+
+
+class Journal:
+    """
+    Sauvegarde au fil des coups d'une partie commencée avec la grille et
+    l'etat donnés, après secondes secondes de jeu : l'instantané est écrit
+    à la création, puis chaque coup noté est ajouté au journal. Le journal
+    ne garde pas de copie de l'état : l'appelant lui passe l'état de la
+    partie à chaque coup et à chaque réécriture de l'instantané
+    """
+
+    def __init__(self, chemin, grille, etat, secondes):
+        self.chemin = chemin
+        self.grille = grille
+        indices = indices_grille(grille)
+        self.geometrie = geometrie_grille(len(indices), len(indices[0]))
+        self.fichier = None
+        self.compacte(etat, secondes)
+
+    def note(self, etat, numero, secondes):
+        """
+        Ajoute au journal le coup joué sur le segment numero (voir
+        moteur.Geometrie) après secondes secondes de jeu, etat étant l'état
+        de la partie après ce coup (qui donne l'action notée, voir
+        action_segment)
+
+        :param etat: dict
+        :param numero: int
+        :param secondes: float
+        """
+        code = ACTIONS.index(action_segment(etat,
+                                            self.geometrie.segments[numero]))
+        self.fichier.write(COUP.pack(secondes, code, numero))
+        self.fichier.flush()
+        self.coups += 1
+        if self.coups >= COMPACTAGE:
+            self.compacte(etat, secondes)
+
+    def compacte(self, etat, secondes):
+        """
+        Réécrit l'instantané avec etat, l'état courant de la partie, et
+        vide le journal
+
+        :param etat: dict
+        :param secondes: float
+        """
+        if self.fichier is not None:
+            self.fichier.close()
+        ecrit_partie(self.chemin, self.grille, etat, secondes)
+        self.fichier = open(self.chemin + '.jnl', 'ab')
+        self.coups = 0
+
+    def ferme(self, etat, secondes):
+        """
+        Compacte une dernière fois la sauvegarde avec etat, l'état courant
+        de la partie, et ferme le journal
+
+        :param etat: dict
+        :param secondes: float
+        """
+        self.compacte(etat, secondes)
+        self.fichier.close()
+        self.fichier = None
+
+    def efface(self):
+        """
+        Ferme le journal et supprime la sauvegarde (partie terminée)
+        """
+        self.fichier.close()
+        self.fichier = None
+        efface_partie(self.chemin)
+
+
+if __name__ == '__main__':
+    testmod()
@@ -0,0 +1,438 @@
+##############################################################################
+#                                                                            #
+#                      Projet Slitherlink - Solveur SAT                      #
+#                                                                            #
+##############################################################################
+
+# Second moteur de résolution : la grille est encodée en CNF (une variable par
+# segment) et résolue par un solveur CDCL écrit en Python pur, sans programme
+# externe. La contrainte "une seule boucle" est ajoutée au fur et à mesure,
+# sous forme de coupes, quand un modèle contient plusieurs boucles.
+
+
+import heapq
+from itertools import combinations
+from doctest import testmod
+from moteur import Etat, cases_segment, dimensions_grille, geometrie_grille
+
+
+def luby(i):
+    """
+    Retourne le i-ème terme (à partir de 1) de la suite de Luby, utilisée
+    pour espacer les redémarrages
+
+    :param i: int
+    :return value: int
+
+    >>> [luby(i) for i in range(1, 10)]
+    [1, 1, 2, 1, 1, 2, 4, 1, 1]
+    """
+    k = 1
+    while (1 << k) - 1 < i:
+        k += 1
+    while (1 << k) - 1 != i:
+        i -= (1 << (k - 1)) - 1
+        k = 1
+        while (1 << k) - 1 < i:
+            k += 1
+    return 1 << (k - 1)
+
+
+class SolveurSAT:
+    """
+    Solveur CDCL : propagation par deux littéraux surveillés, apprentissage
+    de clauses (premier point d'implication unique), heuristique VSIDS,
+    mémorisation des phases et redémarrages selon la suite de Luby.
+
+    Les variables sont numérotées de 1 à nb_variables, un littéral est v ou
+    -v. Des clauses peuvent être ajoutées entre deux appels à resous, les
+    clauses apprises sont conservées.
+
+    >>> solveur = SolveurSAT(3)
+    >>> for clause in ([1, 2], [-1, 3], [-3, -2], [-2, 1]):
+    ...     solveur.ajoute_clause(clause)
+    >>> solveur.resous(), solveur.valeur(1), solveur.valeur(2)
+    (True, True, False)
+    >>> solveur.ajoute_clause([-1])
+    >>> solveur.resous()
+    False
+    """
+
+    facteur_activite = 1 / 0.95
+    redemarrage = 100
+
+    def __init__(self, nb_variables):
+        self.nb_variables = nb_variables
+        self.clauses = []
+        self.surveillances = [[] for _ in range(2 * nb_variables + 1)]
+        self.valeurs = [0] * (nb_variables + 1)
+        self.niveaux = [0] * (nb_variables + 1)
+        self.raisons = [None] * (nb_variables + 1)
+        self.phases = [-1] * (nb_variables + 1)
+        self.activites = [0.] * (nb_variables + 1)
+        self.increment = 1.
+        self.tas = [(0., v) for v in range(1, nb_variables + 1)]
+        self.trainee = []
+        self.limites = []
+        self.tete = 0
+        self.contradiction = False
+        self.nb_conflits = 0
+
+    def valeur(self, litteral):
+        """
+        Retourne True, False ou None (non affecté) selon la valeur du
+        littéral
+        """
+        valeur = self.valeurs[abs(litteral)]
+        if valeur == 0:
+            return None
+        return (valeur > 0) == (litteral > 0)
+
+    def ajoute_clause(self, clause):
+        """
+        Ajoute une clause (liste de littéraux). Le solveur revient au niveau
+        0 : les littéraux faux à ce niveau sont retirés, la clause est
+        ignorée si elle est déjà satisfaite
+
+        :param clause: list
+        """
+        self.retour(0)
+        litteraux = []
+        for litteral in clause:
+            valeur = self.valeur(litteral)
+            if valeur is True:
+                return
+            if valeur is None and litteral not in litteraux:
+                litteraux.append(litteral)
+        if not litteraux:
+            self.contradiction = True
+        elif len(litteraux) == 1:
+            self.affecte(litteraux[0], None)
+        else:
+            self.enregistre(litteraux)
+
+    def enregistre(self, litteraux):
+        """
+        Stocke une clause d'au moins deux littéraux et surveille les deux
+        premiers, retourne son numéro
+        """
+        self.clauses.append(litteraux)
+        numero = len(self.clauses) - 1
+        n = self.nb_variables
+        self.surveillances[litteraux[0] + n].append(numero)
+        self.surveillances[litteraux[1] + n].append(numero)
+        return numero
+
+    def affecte(self, litteral, raison):
+        """
+        Rend litteral vrai au niveau courant, raison est le numéro de la
+        clause qui l'impose (None pour une décision)
+        """
+        variable = abs(litteral)
+        self.valeurs[variable] = 1 if litteral > 0 else -1
+        self.niveaux[variable] = len(self.limites)
+        self.raisons[variable] = raison
+        self.trainee.append(litteral)
+
+    def propage(self):
+        """
+        Propage les affectations en attente, retourne le numéro d'une clause
+        fausse en cas de conflit, None sinon
+        """
+        n = self.nb_variables
+        valeurs = self.valeurs
+        while self.tete < len(self.trainee):
+            faux = -self.trainee[self.tete]
+            self.tete += 1
+            surveillees = self.surveillances[faux + n]
+            gardees = []
+            for k, numero in enumerate(surveillees):
+                clause = self.clauses[numero]
+                if clause[0] == faux:
+                    clause[0], clause[1] = clause[1], faux
+                premier = clause[0]
+                v = valeurs[abs(premier)]
+                if v != 0 and (v > 0) == (premier > 0):
+                    gardees.append(numero)
+                    continue
+                for m in range(2, len(clause)):
+                    autre = clause[m]
+                    w = valeurs[abs(autre)]
+                    if w == 0 or (w > 0) == (autre > 0):
+                        clause[1], clause[m] = autre, faux
+                        self.surveillances[autre + n].append(numero)
+                        break
+                else:
+                    gardees.append(numero)
+                    if v != 0:
+                        gardees.extend(surveillees[k + 1:])
+                        self.surveillances[faux + n] = gardees
+                        return numero
+                    self.affecte(premier, numero)
+            self.surveillances[faux + n] = gardees
+        return None
+
+    def analyse(self, numero):
+        """
+        Analyse le conflit de la clause numero et retourne la clause apprise
+        (le littéral à affirmer en tête) et le niveau où revenir
+        """
+        niveau = len(self.limites)
+        vus = set()
+        apprise = []
+        compteur = 0
+        litteral = None
+        index = len(self.trainee) - 1
+        clause = self.clauses[numero]
+        while True:
+            for q in clause:
+                v = abs(q)
+                if litteral is not None and v == abs(litteral):
+                    continue
+                if v not in vus and self.niveaux[v] > 0:
+                    vus.add(v)
+                    self.augmente_activite(v)
+                    if self.niveaux[v] == niveau:
+                        compteur += 1
+                    else:
+                        apprise.append(q)
+            while abs(self.trainee[index]) not in vus:
+                index -= 1
+            litteral = self.trainee[index]
+            index -= 1
+            vus.discard(abs(litteral))
+            compteur -= 1
+            if compteur == 0:
+                break
+            clause = self.clauses[self.raisons[abs(litteral)]]
+        apprise.insert(0, -litteral)
+        retour = 0
+        for i in range(1, len(apprise)):
+            if self.niveaux[abs(apprise[i])] > retour:
+                retour = self.niveaux[abs(apprise[i])]
+                apprise[1], apprise[i] = apprise[i], apprise[1]
+        return apprise, retour
+
+    def augmente_activite(self, variable):
+        """
+        Augmente l'activité de variable (heuristique VSIDS)
+        """
+        self.activites[variable] += self.increment
+        if self.activites[variable] > 1e100:
+            for v in range(1, self.nb_variables + 1):
+                self.activites[v] *= 1e-100
+            self.increment *= 1e-100
+            self.tas = [(-self.activites[v], v)
+                        for v in range(1, self.nb_variables + 1)
+                        if self.valeurs[v] == 0]
+            heapq.heapify(self.tas)
+        heapq.heappush(self.tas, (-self.activites[variable], variable))
+
+    def retour(self, niveau):
+        """
+        Annule toutes les affectations faites après le niveau donné
+        """
+        if len(self.limites) <= niveau:
+            return
+        limite = self.limites[niveau]
+        for litteral in self.trainee[limite:]:
+            v = abs(litteral)
+            self.phases[v] = self.valeurs[v]
+            self.valeurs[v] = 0
+            self.raisons[v] = None
+            heapq.heappush(self.tas, (-self.activites[v], v))
+        del self.trainee[limite:]
+        del self.limites[niveau:]
+        self.tete = limite
+
+    def choisit(self):
+        """
+        Retourne la variable non affectée la plus active, None si toutes les
+        variables sont affectées
+        """
+        while self.tas:
+            _, v = heapq.heappop(self.tas)
+            if self.valeurs[v] == 0:
+                return v
+        return None
+
+    def resous(self):
+        """
+        Cherche un modèle, retourne True si les clauses sont satisfiables
+        (les valeurs se lisent alors avec valeur), False sinon
+
+        :return value: bool
+        """
+        if self.contradiction:
+            return False
+        numero_redemarrage = 1
+        limite = self.redemarrage * luby(numero_redemarrage)
+        conflits = 0
+        while True:
+            conflit = self.propage()
+            if conflit is not None:
+                if not self.limites:
+                    self.contradiction = True
+                    return False
+                apprise, niveau = self.analyse(conflit)
+                self.retour(niveau)
+                if len(apprise) == 1:
+                    self.affecte(apprise[0], None)
+                else:
+                    self.affecte(apprise[0], self.enregistre(apprise))
+                self.increment *= self.facteur_activite
+                self.nb_conflits += 1
+                conflits += 1
+                if conflits >= limite:
+                    self.retour(0)
+                    numero_redemarrage += 1
+                    limite = self.redemarrage * luby(numero_redemarrage)
+                    conflits = 0
+            else:
+                v = self.choisit()
+                if v is None:
+                    return True
+                self.limites.append(len(self.trainee))
+                self.affecte(v * self.phases[v], None)
+
+
+def encode_grille(indices):
+    """
+    Encode la grille en CNF dans un nouveau SolveurSAT : une variable par
+    segment, degré 0 ou 2 à chaque sommet, nombre exact de segments autour de
+    chaque indice et au moins un segment tracé. Retourne le solveur et le
+    dictionnaire segment -> variable
+
+    :param indices: list
+    :return value: tuple
+
+    >>> solveur, variables = encode_grille([['3', '3']])
+    >>> len(variables), solveur.resous()
+    (7, True)
+    """
+    geometrie = geometrie_grille(*dimensions_grille(indices))
+    # La variable d'un segment est son numéro plus un
+    variables = {segment: numero + 1
+                 for numero, segment in enumerate(geometrie.segments)}
+    solveur = SolveurSAT(len(variables))
+    for autour_sommet in geometrie.autour_sommet:
+        autour = [numero + 1 for numero, _ in autour_sommet]
+        for v in autour:
+            solveur.ajoute_clause([-v] + [w for w in autour if w != v])
+        for trio in combinations(autour, 3):
+            solveur.ajoute_clause([-v for v in trio])
+    for case, indice in enumerate(indice for ligne in indices
+                                  for indice in ligne):
+        if indice is not None:
+            indice = int(indice)
+            autour = [numero + 1 for numero in geometrie.autour_case[case]]
+            for groupe in combinations(autour, indice + 1):
+                solveur.ajoute_clause([-v for v in groupe])
+            for groupe in combinations(autour, 5 - indice):
+                solveur.ajoute_clause(list(groupe))
+    solveur.ajoute_clause(list(variables.values()))
+    return solveur, variables
+
+
+def boucles(segments):
+    """
+    Découpe une liste de segments, dont chaque sommet est de degré 2, en
+    boucles (listes de segments)
+
+    :param segments: list
+    :return value: list
+
+    >>> carre = [((0, 0), (0, 1)), ((0, 0), (1, 0)),
+    ...          ((1, 0), (1, 1)), ((0, 1), (1, 1))]
+    >>> len(boucles(carre)), len(boucles(carre + [((2, 2), (2, 3))]))
+    (1, 2)
+    """
+    voisins = {}
+    for segment in segments:
+        for sommet in segment:
+            voisins.setdefault(sommet, []).append(segment)
+    restants = set(segments)
+    liste_boucles = []
+    for segment in segments:
+        if segment not in restants:
+            continue
+        boucle = []
+        a_voir = [segment]
+        while a_voir:
+            courant = a_voir.pop()
+            if courant not in restants:
+                continue
+            restants.discard(courant)
+            boucle.append(courant)
+            for sommet in courant:
+                a_voir.extend(voisins[sommet])
+        liste_boucles.append(boucle)
+    return liste_boucles
+
+
+def coupes(indices, liste_boucles, variables):
+    """
+    Retourne les clauses qui interdisent le modèle formé de plusieurs
+    boucles : une boucle qui ne touche pas tous les indices non nuls ne peut
+    pas être la solution, sinon elle ne peut pas coexister avec un segment
+    des autres boucles
+
+    :param indices: list
+    :param liste_boucles: list
+    :param variables: dict
+    :return value: list
+    """
+    clauses = []
+    for boucle in liste_boucles:
+        negation = [-variables[segment] for segment in boucle]
+        bordees = set()
+        for segment in boucle:
+            bordees.update(cases_segment(segment))
+        incomplete = False
+        for x in range(len(indices)):
+            for y in range(len(indices[0])):
+                if indices[x][y] not in (None, '0', 0) and \
+                        (x, y) not in bordees:
+                    incomplete = True
+        if incomplete:
+            clauses.append(negation)
+        else:
+            for autre in liste_boucles:
+                if autre is not boucle:
+                    clauses.append(negation + [-variables[autre[0]]])
+    return clauses
+
+
+def resoudre_sat(indices, etat=None):
+    """
+    Résout la grille avec le solveur SAT. Les segments tracés ou interdits de
+    etat sont imposés. Retourne un Etat contenant la boucle, ou None si la
+    grille n'a pas de solution
+
+    :param indices: list
+    :param etat: dict
+    :return value: dict
+
+    >>> len(resoudre_sat([['2', '2'], ['2', '2']]))
+    8
+    >>> resoudre_sat([['3', '0']]) is None
+    True
+    """
+    solveur, variables = encode_grille(indices)
+    if etat is not None:
+        for segment, valeur in etat.items():
+            if segment in variables:
+                solveur.ajoute_clause([valeur * variables[segment]])
+    while solveur.resous():
+        traces = [segment for segment, v in variables.items()
+                  if solveur.valeur(v)]
+        liste_boucles = boucles(traces)
+        if len(liste_boucles) == 1:
+            return Etat({segment: 1 for segment in traces})
+        for clause in coupes(indices, liste_boucles, variables):
+            solveur.ajoute_clause(clause)
+    return None
+
+
+if __name__ == '__main__':
+    testmod()
@@ -6,381 +6,212 @@
 
 
 import fltk
+import moteur
+import cache
+import partie
 import os
-import ast
+import time
 import datetime
 from doctest import testmod
-
-
-def est_trace(etat, segment):
-    """
-    Renvoie True si le segment est tracé, False sinon
-
-    :param etat: dict
-    :param segment: tuple
-    :return value: bool
-
-    >>> est_trace({}, ((0, 0), (0, 1)))
-    False
-    >>> est_trace({((0, 0), (0, 1)): 1}, ((0, 0), (0, 1)))
-    True
-    """
-    if segment in etat and etat[segment] == 1:
-        return True
-    return False
-
-
-def est_interdit(etat, segment):
-    """
-    Renvoie True si le segment est interdit, False sinon
-
-    :param etat: dict
-    :param segment: tuple
-    :return value: bool
-
-    >>> est_interdit({}, ((0, 0), (0, 1)))
-    False
-    >>> est_interdit({((0, 0), (0, 1)): -1}, ((0, 0), (0, 1)))
-    True
-    """
-    if segment in etat and etat[segment] == -1:
-        return True
-    return False
-
-
-def est_vierge(etat, segment):
-    """
-    Renvoie True si le segment est vierge, False sinon
-
-    :param etat: dict
-    :param segment: tuple
-    :return value: bool
-
-    >>> est_vierge({}, ((0, 0), (0, 1)))
-    True
-    >>> est_vierge({((0, 0), (0, 1)): 1}, ((0, 0), (0, 1)))
-    False
-    """
-    if segment not in etat:
-        return True
-    return False
-
-
-def tracer_segment(etat, segment):
-    """
-    Trace segment dans etat
-
-    :param etat: dict
-    :param segment: tuple
-    :return value: dict
-
-    >>> tracer_segment({}, ((0, 0), (1, 0)))
-    {((0, 0), (1, 0)): 1}
-    """
-    etat[segment] = 1
-    return etat
-
-
-def interdire_segment(etat, segment):
-    """
-    Interdit segment dans etat
-
-    :param etat: dict
-    :param segment: tuple
-    :return value: dict
-
-    >>> interdire_segment({}, ((0, 0), (1, 0)))
-    {((0, 0), (1, 0)): -1}
-    """
-    etat[segment] = -1
-    return etat
-
-
-def effacer_segment(etat, segment):
-    """
-    Efface segment dans etat
+from moteur import (est_trace, est_interdit, tracer_segment,
+                    interdire_segment, effacer_segment)
+from collection import Collection
+from lot import liste_grilles
+
+
+# Dimensions (lignes x colonnes) proposées par le créateur de grilles
+TAILLES_CREATEUR = ['2x2', '3x3', '4x4', '5x5', '6x6', '8x8', '10x10',
+                    '15x15', '20x20', '20x36', '30x30', '50x50', '100x100']
+
+# Collection où le créateur enregistre les grilles (voir collection.py), en
+# plus des grilles .txt du dossier "grilles"
+FICHIER_COLLECTION = os.path.join('grilles', 'collection.slk')
+
+# Nombre maximal de nœuds de la vérification d'unicité du créateur, au-delà
+# la grille est refusée comme trop difficile (l'interface resterait figée)
+NOEUDS_CREATEUR = 20000
+
+# Partie en cours (voir partie.py) et son nom dans le menu de sélection
+FICHIER_PARTIE = os.path.join('grilles', 'reprendre-grille.partie')
+NOM_PARTIE = 'reprendre-grille'
+
+# Valeur d'un segment dans etat après chaque action du moteur
+VALEURS_ACTIONS = {'trace': 1, 'interdit': -1, 'efface': 0}
+
+# Dimensions d'une case du menu de sélection des grilles
+LARGEUR_CHOIX, HAUTEUR_CHOIX = 125, 50
+
+# Images par seconde du solveur graphique (et fréquence de scrutation des
+# évènements du solveur)
+IMAGES_PAR_SECONDE = 30
+
+# Nœuds explorés par image, au choix du curseur de vitesse
+VITESSES = (1, 2, 5, 10, 20, 50, 100, 200, 500, 1000, 2000, 5000, 10000)
+VITESSE_DEFAUT = 3
+
+# Position du curseur de vitesse (à la place du bouton "Afficher dans la
+# console", qui n'apparaît qu'à la fin de la recherche)
+CURSEUR_X1, CURSEUR_X2, CURSEUR_Y = 15, 160, 565
+
+
+class Dessin:
+    """
+    Objets du canevas qui représentent les indices et les segments d'une
+    grille de cases de taille case à marge pixels du bord. Les segments
+    sont désignés par leur numéro dans geometrie (moteur.Geometrie), dont
+    les coordonnées sur le canevas sont calculées une fois pour toutes. Les
+    points et les boutons sont dessinés une fois pour toutes ; un indice ou
+    un segment qui change ne fait que modifier ses objets (fltk.modifie,
+    fltk.deplace). Les traits et les croix cachés sont gardés dans une
+    réserve et réutilisés pour le prochain segment affiché : le canevas ne
+    contient jamais plus d'objets que de segments affichés à la fois
+    """
+
+    def __init__(self, geometrie, marge, case):
+        self.geometrie = geometrie
+        self.marge = marge
+        self.case = case
+        self.pixels = geometrie.pixels(marge, case)
+        self.epaisseur = epaisseur_segment(case)
+        self.taille_texte = max(1, int(min(24, case / 2)))
+        self.textes = {}
+        self.traits = {}
+        self.croix = {}
+        self.traits_libres = []
+        self.croix_libres = []
+
+    def indice(self, i, j, indice):
+        """
+        Affiche indice (None pour aucun) dans la case (i, j)
+
+        :param i: int
+        :param j: int
+        :param indice: str
+        """
+        chaine = '' if indice is None else str(indice)
+        if (i, j) in self.textes:
+            fltk.modifie(self.textes[(i, j)], text=chaine)
+        elif chaine:
+            self.textes[(i, j)] = fltk.texte(
+                self.marge + (j + .5) * self.case,
+                self.marge + (i + .5) * self.case, chaine,
+                ancrage='center', taille=self.taille_texte)
+
+    def segment(self, numero, valeur):
+        """
+        Affiche le segment numero tracé (valeur 1), interdit (-1) ou libre
+        (0)
+
+        :param numero: int
+        :param valeur: int
+        """
+        if numero in self.traits and valeur != 1:
+            trait = self.traits.pop(numero)
+            fltk.modifie(trait, state='hidden')
+            self.traits_libres.append(trait)
+        if numero in self.croix and valeur != -1:
+            croix = self.croix.pop(numero)
+            for trait in croix:
+                fltk.modifie(trait, state='hidden')
+            self.croix_libres.append(croix)
+        if valeur == 1 and numero not in self.traits:
+            self.traits[numero] = self.affiche_trait(numero)
+        elif valeur == -1 and numero not in self.croix:
+            self.croix[numero] = self.affiche_croix(numero)
+
+    def affiche_trait(self, numero):
+        """
+        Affiche le trait du segment numero en réutilisant un trait caché
+        s'il y en a, et retourne son identificateur
+
+        :param numero: int
+        :return value: int
+        """
+        if not self.traits_libres:
+            return fltk.ligne(*self.pixels[numero], epaisseur=self.epaisseur)
+        trait = self.traits_libres.pop()
+        fltk.deplace(trait, *self.pixels[numero])
+        fltk.modifie(trait, state='normal')
+        return trait
+
+    def affiche_croix(self, numero):
+        """
+        Affiche la croix rouge du segment interdit numero en réutilisant
+        une croix cachée s'il y en a, et retourne les identificateurs de ses
+        deux traits
+
+        :param numero: int
+        :return value: tuple
+        """
+        ax, ay, bx, by = self.pixels[numero]
+        x, y = (ax + bx) / 2, (ay + by) / 2
+        demi = self.epaisseur * 5 / 8
+        points = ((x - demi, y - demi, x + demi, y + demi),
+                  (x + demi, y - demi, x - demi, y + demi))
+        if not self.croix_libres:
+            return tuple(fltk.ligne(*point, epaisseur=self.epaisseur / 3,
+                                    couleur='red') for point in points)
+        croix = self.croix_libres.pop()
+        for trait, point in zip(croix, points):
+            fltk.deplace(trait, *point)
+            fltk.modifie(trait, state='normal')
+        return croix
+
+
+def tracer_segment_graphique(etat, numero, dessin):
+    """
+    Trace le segment numero dans etat, ou l'efface s'il était déjà tracé,
+    et met à jour son dessin
 
     :param etat: dict
-    :param segment: tuple
-    :return value: dict
-
-    >>> effacer_segment({((0, 0), (1, 0)): 1}, ((0, 0), (1, 0)))
-    {}
-    """
-    etat.pop(segment)
-    return etat
-
-
-def tracer_segment_graphique(etat, segment, coord, epaisseur):
-    """
-    Trace un segment graphiquement et utilise tracer_segment pour le tracer
-    dans etat
-
-    :param etat: dict
-    :param segment: tuple
-    :param coord: list
-    :param epaisseur: int
+    :param numero: int
+    :param dessin: Dessin
     :return value: dict
     """
-    a, b, c, d = coord
-    segment_str = codeTag(segment)
+    segment = dessin.geometrie.segments[numero]
     if est_trace(etat, segment):
-        etat = effacer_segment_graphique(etat, segment)
-    elif est_interdit(etat, segment):
-        etat = effacer_segment_graphique(etat, segment)
-        fltk.efface(segment_str)
-        etat = tracer_segment(etat, segment)
-        fltk.ligne(b, a, d, c, epaisseur=epaisseur,
-                   tag=segment_str)
+        etat = effacer_segment(etat, segment)
     else:
         etat = tracer_segment(etat, segment)
-        fltk.ligne(b, a, d, c, epaisseur=epaisseur,
-                   tag=segment_str)
+    dessin.segment(numero, etat.get(segment, 0))
     return etat
 
 
-def trace_croix(coord, epaisseur, segment_str):
-    """
-    Dessine une croix rouge utilisée pour interdire un segment
-
-    :param coord: list
-    :param epaisseur: int
-    :param segment_str: str
-    """
-    a, b, c, d = coord
-    fltk.ligne((b+d)/2-5, (a+c)/2-5, (b+d)/2+5, (a+c) /
-               2+5, epaisseur=epaisseur/3, couleur='red', tag=segment_str)
-    fltk.ligne((b+d)/2+5, (a+c)/2-5, (b+d)/2-5, (a+c) /
-               2+5, epaisseur=epaisseur/3, couleur='red', tag=segment_str)
-
-
-def codeTag(segment):
+def epaisseur_segment(case):
     """
-    Code un tag exclusif à un segment en str, c'est utilisé pour supprimer un
-    segment avec fltk.efface(tag)
+    Retourne l'épaisseur des segments pour des cases de taille case, afin
+    que les grandes grilles restent lisibles
 
-    :param segment: tuple
-    :return value: str
+    :param case: float
+    :return value: float
 
-    >>> codeTag(((0, 0), (0, 1)))
-    '@@@A'
-    >>> codeTag(((1, 2), (2, 2)))
-    'ABBB'
+    >>> epaisseur_segment(75)
+    8
+    >>> epaisseur_segment(12.5)
+    3.125
     """
-    segment_str = ''
-    for point in segment:
-        for coord in point:
-            segment_str += chr(ord('@')+(int(coord)))
-    return segment_str
+    return min(8, max(1, case / 4))
 
 
-def interdire_segment_graphique(etat, segment, coord, epaisseur):
+def interdire_segment_graphique(etat, numero, dessin):
     """
-    Interdit un segment graphiquement et utilise interdire_segment pour
-    l'interdire dans etat
+    Interdit le segment numero dans etat, ou l'efface s'il était déjà
+    interdit, et met à jour son dessin
 
     :param etat: dict
-    :param segment: tuple
-    :param coord: list
-    :param epaisseur: int
+    :param numero: int
+    :param dessin: Dessin
     :return value: dict
     """
-    segment_str = codeTag(segment)
+    segment = dessin.geometrie.segments[numero]
     if est_interdit(etat, segment):
-        etat = effacer_segment_graphique(etat, segment)
-        fltk.efface(segment_str)
-    elif est_trace(etat, segment):
-        etat = effacer_segment_graphique(etat, segment)
-        fltk.efface(segment_str)
-        etat = interdire_segment(etat, segment)
-        trace_croix(coord, epaisseur, segment_str)
+        etat = effacer_segment(etat, segment)
     else:
         etat = interdire_segment(etat, segment)
-        trace_croix(coord, epaisseur, segment_str)
-    return etat
-
-
-def effacer_segment_graphique(etat, segment):
-    """
-    Efface un segment graphiquement et utilise effacer_segment pour
-    l'effacer dans etat
-
-    :param etat: dict
-    :param segment: tuple
-    :return value: dict
-    """
-    segment_str = codeTag(segment)
-    etat = effacer_segment(etat, segment)
-    fltk.efface(segment_str)
+    dessin.segment(numero, etat.get(segment, 0))
     return etat
 
 
-def segments_traces(etat, sommet):
-    """
-    Renvoie la liste des segments tracés autour d'un sommet
-
-    :param etat: dict
-    :param sommet: tuple
-    :return value: list
-
-    >>> segments_traces({((2, 2), (3, 2)): 1, ((2, 2), (2, 3)): 1}, (2, 2))
-    [((2, 2), (3, 2)), ((2, 2), (2, 3))]
-    """
-    liste_segments = []
-    for segment in etat:
-        if sommet in segment and etat[segment] == 1:
-            liste_segments.append(segment)
-    return liste_segments
-
-
-def statut_case(indices, etat, case):
-    """
-    Retourne le statut de la case passée en paramètre. 0 si l'indice est
-    satisfait, -1 et 1 si il ne l'est pas, pas assez ou trop de segments
-    autour
-
-    :param indices: list
-    :param etat: dict
-    :param case: tuple
-
-    >>> indices = [[None, 3, 1]]
-    >>> etat = {((0, 1), (0, 2)): 1, ((0, 2), (0, 3)): 1, ((0, 3), (1, 3)): 1}
-    >>> statut_case(indices, etat, (0, 1))
-    -1
-    >>> statut_case(indices, etat, (0, 2))
-    1
-    >>> etat = {((0, 1), (0, 2)): 1, ((0, 2), (0, 3)): 1}
-    >>> statut_case(indices, etat, (0, 2))
-    0
-    """
-    x, y = case
-    if indices[x][y] is None:
-        return None
-    else:
-        liste_segments = [(case, (x, y+1)), (case, (x+1, y)),
-                          ((x+1, y), (x+1, y+1)), ((x, y+1), (x+1, y+1))]
-        nombre_segments = 0
-
-        for segment in etat:
-            if segment in liste_segments and etat[segment] == 1:
-                nombre_segments += 1
-        if int(indices[x][y]) == nombre_segments:
-            return 0
-        elif int(indices[x][y]) < nombre_segments:
-            return 1
-        elif int(indices[x][y]) > nombre_segments:
-            return -1
-
-
-def indices_satisfaits(indices, etat):
-    """
-    Renvoie True si tous les indices sont satisfaits, False sinon
-
-    :param indices: list
-    :param etat: dict
-
-    >>> indices = [[2, 1]]
-    >>> etat = {((0, 0), (0, 1)): 1, ((0, 1), (1, 1)): 1}
-    >>> indices_satisfaits(indices, etat)
-    True
-    >>> etat = {((0, 0), (0, 1)): 1, ((0, 1), (0, 2)): 1}
-    >>> indices_satisfaits(indices, etat)
-    False
-    """
-    indice = []
-    for i in range(len(indices)):
-        for j in range(len(indices[i])):
-            if indices[i][j] is not None:
-                case = (i, j)
-                indice.append(statut_case(indices, etat, case))
-    for elem in indice:
-        if elem != 0:
-            return False
-    return True
-
-
-def longueur_boucle(etat, segment):
-    """
-    Renvoie la longueur de la boucle si les segments forment une boucle sinon
-    renvoie None
-
-    :param etat: dict
-    :param sommet: tuple
-
-    >>> etat = {((0, 0), (0, 1)): 1, ((0, 1), (1, 1)): 1}
-    >>> etat2 = {((1, 0), (1, 1)): 1, ((0, 0), (1, 0)): 1}
-    >>> etat.update(etat2)
-    >>> longueur_boucle(etat, ((0, 0), (1, 0)))
-    4
-    >>> etat = {((0, 0), (0, 1)): 1, ((0, 1), (1, 1)): 1}
-    >>> longueur_boucle(etat, ((0, 1), (1, 1)))
-    """
-    depart = segment[0]
-    precedent = segment[0]
-    courant = segment[1]
-    nb_seg = 0
-    while courant != depart:
-        segments_courant = []
-        for seg in etat:
-            if etat[seg] == 1:
-                point1, point2 = seg
-                if point1 == courant or point2 == courant:
-                    segments_courant.append(seg)
-        if len(segments_courant) != 2:
-            return None
-        else:
-            nb_seg += 1
-            for seg in segments_courant:
-                if precedent not in seg:
-                    precedent = courant
-                    for point in seg:
-                        if point != precedent:
-                            courant = point
-    nb_seg += 1
-    return nb_seg
-
-
-def nombre_segments(etat):
-    """
-    Renvoie la nombre de segments au total dans segments
-
-    :param etat: dict
-
-    >>> etat = {((0, 0), (0, 1)): 1, ((0, 1), (0, 2)): 1}
-    >>> nombre_segments(etat)
-    2
-    """
-    nb_total_seg = 0
-    for segment in etat:
-        if etat[segment] == 1:
-            nb_total_seg += 1
-    return nb_total_seg
-
-
-def victoire(etat, indices, segment):
-    """
-    Renvoie True si le joueur gagne, False sinon
-
-    :param etat: dict
-    :param indices: list
-    :param segment: tuple
-
-    >>> etat = {((0, 0), (0, 1)): 1, ((0, 1), (0, 2)): 1, ((0, 2), (1, 2)): 1}
-    >>> etat2 = {((1, 2), (2, 2)): 1, ((2, 1), (2, 2)): 1}
-    >>> etat3 = {((2, 0), (2, 1)): 1, ((1, 0), (2, 0)): 1, ((0, 0), (1, 0)): 1}
-    >>> etat.update(etat2)
-    >>> etat.update(etat3)
-    >>> indices = [[2, 2], [2, 2]]
-    >>> victoire(etat, indices, ((0, 0), (1, 0)))
-    True
-    """
-    if segment is not None:
-        if indices_satisfaits(indices, etat) and \
-                longueur_boucle(etat, segment) == nombre_segments(etat):
-            return True
-    return False
-
-
 def pixel_vers_case(x, y, marge, case):
     """
     Retourne la case en fonction de x, y en px
@@ -398,78 +229,18 @@ def pixel_vers_case(x, y, marge, case):
     return int((x - marge) // case), int((y - marge) // case)
 
 
-def case_vers_pixel(a, b, marge, case):
-    """
-    Retourne les coordonnées en px d'une case en fonction de a et b
-    marge et case correspondent à leurs tailles respectives
-
-    :param a: int
-    :param b: int
-    :param marge: int
-    :param case: int
-    :return value: tuple
-
-    >>> case_vers_pixel(0, 0, 25, 50)
-    (25, 25)
-    """
-    return int(a * case + marge), int(b * case + marge)
-
-
-def coordonnees_segments(i, j, marge, case, vertical, horizontal):
+def afficher_etat(etat, dessin):
     """
-    Retourne les coordonnées en px des sommets d'un segment
-
-    :param i: int
-    :param j: int
-    :param marge: int
-    :param case: int
-    :param vertical: int
-    :param horizontal: int
-    :return value: tuple
-
-    >>> coordonnees_segments(0, 0, 25, 50, 1, 0)
-    (25, 25, 75, 25)
-    >>> coordonnees_segments(0, 0, 25, 50, 0, 1)
-    (25, 25, 25, 75)
-    """
-    a, b = case_vers_pixel(i, j, marge, case)
-    c, d = case_vers_pixel(i + vertical, j + horizontal, marge, case)
-    return a, b, c, d
-
-
-def donne_segment(coord, marge, case):
-    """
-    Retourne le segment au format ((w, x), (y, z))
-
-    :param coord: list
-    :param marge: int
-    :param case: int
-    :return value: tuple
-
-    >>> donne_segment([25, 25, 25, 75], 25, 50)
-    ((0, 0), (0, 1))
-    """
-    a, b, c, d = coord
-    segment = (pixel_vers_case(a, b, marge, case),
-               pixel_vers_case(c, d, marge, case))
-    return segment
-
-
-def afficher_etat(etat, marge, case, epaisseur):
-    """
-    Affiche etat graphiquement
+    Affiche etat graphiquement. Ne sert qu'aux états lus (partie
+    sauvegardée, cache des solutions) : pendant la partie et la recherche,
+    les segments sont dessinés par numéro
 
     :param etat: dict
-    :param marge: int
-    :param case: int
-    :param epaisseur: int
+    :param dessin: Dessin
     """
-    for segment in etat:
-        a, b = case_vers_pixel(
-            segment[0][0], segment[0][1], marge, case)
-        c, d = case_vers_pixel(
-            segment[1][0], segment[1][1], marge, case)
-        fltk.ligne(b, a, d, c, epaisseur=epaisseur)
+    numeros = dessin.geometrie.numeros
+    for segment, valeur in etat.items():
+        dessin.segment(numeros[segment], valeur)
 
 
 def affiche_etat_console(etat):
@@ -564,205 +335,190 @@ def bouton_quitter(texte):
                ancrage='center', taille=14, tag='quitter')
 
 
-def efface_grille(grille):
-    """
-    Supprime la grille passée en paramètre dans le dossier "grilles"
-
-    :param grille: str
-    """
-    os.remove('grilles/'+grille)
-
-
-def gestion_solveur(etat, segment, som, graph, ind, marge, case, ep):
+def gestion_ev(vitesse=None):
     """
-    Gère les évènements du solveur (tracer et effacer des segments,
-    récursivité) et retourne etat
+    Gère les évènements en attente pendant l'utilisation du solveur : la
+    croix de la fenêtre et le bouton "Quitter" (retourne True) et, si
+    vitesse (liste contenant l'indice dans VITESSES) est donnée, le curseur
+    de vitesse
 
-    :param etat: dict
-    :param segment: tuple
-    :param som: int
-    :param graph: bool
-    :param ind: list
-    :param marge: int
-    :param case: int
-    :param ep: int
-    :return value: dict
+    :param vitesse: list
+    :return value: bool
     """
-    if est_trace(etat, segment) is False:
-        etat = tracer_segment_solveur(
-            etat, segment, graph, marge, case, ep)
-        if solveur(etat, ind, segment[som], graph, marge, case, ep) is True:
+    ev = fltk.donne_ev()
+    while ev is not None:
+        tev = fltk.type_ev(ev)
+        if tev == 'Quitte':
             return True
-        else:
-            if graph is True:
-                etat = effacer_segment_graphique(etat, segment)
-            else:
-                etat = effacer_segment(etat, segment)
-    return etat
-
+        elif tev == 'ClicGauche':
+            x, y = fltk.abscisse(ev), fltk.ordonnee(ev)
+            if 340 <= x <= 490 and 535 <= y <= 585:
+                return True
+            elif vitesse is not None and \
+                    CURSEUR_X1 - 5 <= x <= CURSEUR_X2 + 5 and \
+                    CURSEUR_Y - 15 <= y <= CURSEUR_Y + 15:
+                vitesse[0] = position_vitesse(x)
+                affiche_vitesse(vitesse[0])
+        ev = fltk.donne_ev()
+    return False
 
-def tracer_segment_solveur(etat, segment, graphique, marge, case, epaisseur):
-    """
-    Trace les segments du solveur en fonction du mode choisi : graphique ou non
 
-    :param etat: dict
-    :param segment: tuple
-    :param graph: bool
-    :param marge: int
-    :param case: int
-    :param ep: int
-    :return value: dict
+def position_vitesse(x):
     """
-    if graphique is True:
-        a, b = case_vers_pixel(
-            segment[0][0], segment[0][1], marge, case)
-        c, d = case_vers_pixel(
-            segment[1][0], segment[1][1], marge, case)
-        etat = tracer_segment_graphique(
-            etat, segment, [a, b, c, d], epaisseur)
-    else:
-        etat = tracer_segment(etat, segment)
-    return etat
+    Retourne l'indice dans VITESSES correspondant à l'abscisse x d'un clic
+    sur le curseur de vitesse
 
+    :param x: int
+    :return value: int
 
-def indices_insatisfaits(indices, etat):
+    >>> position_vitesse(CURSEUR_X1), position_vitesse(CURSEUR_X2 + 5)
+    (0, 12)
     """
-    Reourne False si au moins un indice a trop de segments tracés autour
-
-    :param indices: list
-    :param etat: dict
-    :return value: bool
+    pas = (CURSEUR_X2 - CURSEUR_X1) / (len(VITESSES) - 1)
+    return min(len(VITESSES) - 1, max(0, round((x - CURSEUR_X1) / pas)))
 
-    >>> indices = [[1]]
-    >>> etat = {((0, 0), (0, 1)): 1, ((0, 0), (1, 0)): 1}
-    >>> indices_insatisfaits(indices, etat)
-    False
-    """
-    for i in range(len(indices)):
-        for j in range(len(indices[i])):
-            if indices[i][j] is not None:
-                case = (i, j)
-                if statut_case(indices, etat, case) == 1:
-                    return False
 
-
-def gestion_ev():
+def affiche_vitesse(indice):
     """
-    Gère les évènements pendant l'utilisation du solveur, la croix de la
-    fenêtre et le bouton "Quitter"
+    Affiche le curseur de vitesse du solveur graphique, positionné sur
+    VITESSES[indice]
 
-    :return value: bool
+    :param indice: int
     """
-    ev = fltk.donne_ev()
-    tev = fltk.type_ev(ev)
-    if tev == 'Quitte':
-        return True
-    elif tev == 'ClicGauche':
-        x, y = fltk.abscisse(ev), fltk.ordonnee(ev)
-        if 340 <= x <= 490 and 535 <= y <= 585:
-            return True
+    fltk.efface('vitesse')
+    pas = (CURSEUR_X2 - CURSEUR_X1) / (len(VITESSES) - 1)
+    x = CURSEUR_X1 + indice * pas
+    fltk.texte((CURSEUR_X1 + CURSEUR_X2) / 2, CURSEUR_Y - 20,
+               'Vitesse : ' + str(VITESSES[indice]) + ' nœuds/image',
+               ancrage='center', taille=9, tag='vitesse')
+    fltk.rectangle(CURSEUR_X1, CURSEUR_Y - 2, CURSEUR_X2, CURSEUR_Y + 2,
+                   couleur='grey', remplissage='grey', tag='vitesse')
+    fltk.rectangle(x - 4, CURSEUR_Y - 9, x + 4, CURSEUR_Y + 9,
+                   couleur='RoyalBlue3', remplissage='RoyalBlue3',
+                   tag='vitesse')
 
 
-def solveur(etat, indices, sommet, graphique, marge, case, epaisseur):
+def observateur_solveur(graphique, dessin):
     """
-    Fonction récursive gérant le solveur, l'appel récursif se fait dans la
-    fonciton gestion_solveur.
+    Retourne la fonction passée au moteur de recherche. La recherche n'est
+    pas ralentie par l'affichage : les modifications des segments (par
+    numéro) sont seulement notées, la dernière de chaque segment comptant.
+    En mode graphique, elles sont dessinées toutes les VITESSES[vitesse]
+    nœuds, au plus IMAGES_PAR_SECONDE fois par seconde. Les évènements sont
+    traités à chaque image, ou IMAGES_PAR_SECONDE fois par seconde hors du
+    mode graphique. L'appel ('fin', None), fait après la recherche, dessine
+    les modifications restantes
 
-    :param etat: dict
-    :param indices: list
-    :param sommet: int
     :param graphique: bool
-    :param marge: int
-    :param case: int
-    :param epaisseur: int
-    :return value: bool
+    :param dessin: Dessin
+    :return value: function
     """
+    modifications = {}
+    vitesse = [VITESSE_DEFAUT]
+    noeuds = [0]
+    prochaine = [time.perf_counter()]
     if graphique is True:
-        fltk.attente(1/100)
-    if (len(segments_traces(etat, sommet)) == 2 and
-            indices_satisfaits(indices, etat)):
-        affiche_victoire('Solution trouvée', 'green')
-        return True
-    elif gestion_ev():
-        return True
-    elif len(segments_traces(etat, sommet)) >= 2 or \
-            indices_insatisfaits(indices, etat) is False:
-        return False
-    else:
-        segment = (sommet, (sommet[0], sommet[1]))
-        if segment[1][1] < len(indices[0]) and etat is not True:
-            segment = (sommet, (sommet[0], sommet[1]+1))
-            etat = gestion_solveur(
-                etat, segment, 1, graphique, indices, marge, case, epaisseur)
-        if segment[1][0] < len(indices) and etat is not True:
-            segment = (sommet, (sommet[0]+1, sommet[1]))
-            etat = gestion_solveur(
-                etat, segment, 1, graphique, indices, marge, case, epaisseur)
-        if sommet[1] > 0 and etat is not True:
-            segment = ((sommet[0], sommet[1]-1), sommet)
-            etat = gestion_solveur(
-                etat, segment, 0, graphique, indices, marge, case, epaisseur)
-        if sommet[0] > 0 and etat is not True:
-            segment = ((sommet[0]-1, sommet[1]), sommet)
-            etat = gestion_solveur(
-                etat, segment, 0, graphique, indices, marge, case, epaisseur)
-        if etat is True:
-            return True
-    return False
+        affiche_vitesse(vitesse[0])
+
+    def dessine():
+        for numero, action in modifications.items():
+            dessin.segment(numero, VALEURS_ACTIONS[action])
+        modifications.clear()
+
+    def observateur(action, numero):
+        if action == 'noeud':
+            if graphique is True:
+                noeuds[0] += 1
+                if noeuds[0] < VITESSES[vitesse[0]]:
+                    return False
+                noeuds[0] = 0
+                dessine()
+                fltk.mise_a_jour()
+                reste = prochaine[0] - time.perf_counter()
+                if reste > 0:
+                    fltk.attente(reste)
+                prochaine[0] = max(prochaine[0] + 1 / IMAGES_PAR_SECONDE,
+                                   time.perf_counter())
+                return gestion_ev(vitesse)
+            if time.perf_counter() < prochaine[0]:
+                return False
+            fltk.mise_a_jour()
+            prochaine[0] = time.perf_counter() + 1 / IMAGES_PAR_SECONDE
+            return gestion_ev()
+        elif action == 'fin':
+            dessine()
+            if graphique is True:
+                fltk.efface('vitesse')
+        else:
+            modifications[numero] = action
+    return observateur
 
 
-def selectionne_sommet(etat, indices, graphique, taille_marge, taille_case):
+def selectionne_sommet(etat, indices, graphique, dessin, statistiques=None):
     """
-    Fonction qui sélectionne les points pour le solveur par ordre de priorité,
-    d'abord les sommets autour d'un indice '3', puis '2', puis '1' et enfin
-    tous les autres
+    Lance le moteur de recherche sur etat en affichant sa progression si
+    graphique vaut True, ou seulement son résultat sinon. Retourne True si
+    une solution est trouvée, None si le joueur a arrêté le solveur, False
+    sinon. L'objet Statistiques éventuel reçoit le bilan de la recherche
 
     :param etat: dict
     :param indices: list
     :param graphique: bool
-    :param taille_marge: int
-    :param taille_case: int
+    :param dessin: Dessin
+    :param statistiques: Statistiques
     :return value: bool
     """
-    for indice in range(3, -1, -1):
-        for i in range(len(indices)):
-            for j in range(len(indices[i])):
-                if indice == 0:
-                    indice = None
-                else:
-                    indice = str(indice)
-                if indices[i][j] == indice:
-                    case = (i, j)
-                    x, y = case
-                    liste_sommets = [case, (x, y+1), (x+1, y), (x+1, y+1)]
-                    for sommet in liste_sommets:
-                        if solveur(etat, indices, sommet, graphique,
-                                   taille_marge, taille_case, 8) is True:
-                            return True
-    return False
+    observateur = observateur_solveur(graphique, dessin)
+    resultat = moteur.selectionne_sommet(etat, indices, observateur,
+                                         statistiques)
+    observateur('fin', None)
+    return resultat
 
 
 def newSolveur(graphique, largeur, hauteur):
     """
-    Gère l'affichage et la gestion des modes solveur et solveur graphique
+    Gère l'affichage et la gestion des modes solveur et solveur graphique.
+    Une grille dont la solution est dans le cache des solutions est
+    affichée résolue sans lancer la recherche
 
     :param graphique: bool
     :param largeur: int
     :param hauteur: int
     """
     fltk.efface_tout()
-    grille, etat, _ = selection_grille(hauteur, largeur, os.listdir('grilles'))
-    taille_case, taille_marge, indices = affiche_grille(
-        grille, largeur, largeur)
+    grille, etat, _ = selection_grille(hauteur, largeur, grilles_dossier(),
+                                       FICHIER_COLLECTION)
+    _, _, indices, dessin = affiche_grille(grille, largeur, largeur)
     bouton_quitter('Stop')
     if graphique is False:
         fltk.attente(0.1)
     temps1 = donne_temps()
-    if selectionne_sommet(etat, indices, graphique, taille_marge,
-                          taille_case) is True:
-        if graphique is False:
-            afficher_etat(etat, taille_marge, taille_case, epaisseur=8)
+    base = cache.ouvre_cache()
+    connue = base.cherche(indices, etat) if base is not None else None
+    afficher_etat(etat, dessin)
+    if connue is not None:
+        solution = connue[0]
+        resultat = solution is not None
+        if resultat:
+            etat.update(solution)
+            afficher_etat(solution, dessin)
     else:
+        statistiques = moteur.Statistiques()
+        depart = dict(etat)
+        resultat = selectionne_sommet(etat, indices, graphique, dessin,
+                                      statistiques)
+        if base is not None and resultat is not None:
+            solution = None
+            if resultat is True:
+                solution = {segment: 1 for segment in etat
+                            if est_trace(etat, segment)}
+            base.enregistre(indices, solution, statistiques.vers_dict(),
+                            depart)
+    if base is not None:
+        base.ferme()
+    if resultat is True:
+        affiche_victoire('Solution trouvée', 'green')
+    elif resultat is False:
         affiche_victoire('Aucune solution', 'red')
     affiche_temps(calcule_temps(temps1, donne_temps(), [0, 0]))
     fltk.efface('quitter')
@@ -809,93 +565,122 @@ def createur_grille(largeur, hauteur):
     :param hauteur: int
     """
     fltk.efface_tout()
-    taille, _, _ = selection_grille(
-        hauteur, largeur, ['2x2', '3x3', '4x4', '5x5', '6x6'])
-    taille = taille[:1]
+    dimensions, _, _ = selection_grille(hauteur, largeur, TAILLES_CREATEUR)
+    lignes, colonnes = dimensions.split('x')
     grille = []
-    for _ in range(int(taille)):
-        grille.append('_' * int(taille) + '\n')
-    case, marge, indices = affiche_grille(
+    for _ in range(int(lignes)):
+        grille.append('_' * int(colonnes) + '\n')
+    case, marge, indices, dessin = affiche_grille(
         grille, largeur, largeur)
     bouton_quitter('Quitter')
     fltk.rectangle(10, 535, 165, 585, couleur='RoyalBlue3',
                    remplissage='RoyalBlue3')
-    fltk.texte(90, 560, 'Enregistrer : "Grille' +
-               str(numero_grille()) + '"', couleur='white',
-               ancrage='center', taille=10)
+    fltk.texte(90, 560, 'Enregistrer : "' + nom_collection(numero_grille()) +
+               '"', couleur='white', ancrage='center', taille=10)
     save = False
     while True:
         ev = fltk.attend_ev()
         tev = fltk.type_ev(ev)
         if tev == 'ClicGauche':
             y, x = fltk.abscisse(ev), fltk.ordonnee(ev)
-            if marge < x < largeur - marge and marge < y < largeur - marge:
+            if marge < x < marge + len(indices) * case and \
+                    marge < y < marge + len(indices[0]) * case:
                 i, j = pixel_vers_case(x, y, marge, case)
                 if indices[i][j] is None:
-                    indices[i][j] = 0
-                    grille = ajoute_indice(grille, str(indices[i][j]), i, j)
+                    indices[i][j] = '0'
                 elif int(indices[i][j]) < 3:
-                    ind = int(indices[i][j])
-                    ind += 1
-                    indices[i][j] = ind
-                    grille = ajoute_indice(grille, str(indices[i][j]), i, j)
-
+                    indices[i][j] = str(int(indices[i][j]) + 1)
                 else:
                     indices[i][j] = None
-                    ajoute_indice(grille, '_', i, j)
-                fltk.efface_tout()
-                case, marge, indices = affiche_grille(
-                    grille, largeur, largeur)
-                bouton_quitter('Quitter')
-                fltk.rectangle(10, 535, 165, 585, couleur='RoyalBlue3',
-                               remplissage='RoyalBlue3')
-                fltk.texte(90, 560, 'Enregistrer : "Grille' +
-                           str(numero_grille()) + '"', couleur='white',
-                           ancrage='center', taille=10)
+                grille = ajoute_indice(grille, indices[i][j] or '_', i, j)
+                dessin.indice(i, j, indices[i][j])
             if 340 <= y <= 490 and 535 <= x <= 585:
                 break
             if 10 <= y <= 165 and 535 <= x <= 585 and save is False:
-                sauvegarde_grille(grille, {}, False, 0)
-                fltk.texte(250, 560, 'Grille Sauvegardée', couleur='green',
-                           ancrage='center', taille=14)
-                save = True
+                nb_solutions = moteur.count_solutions(
+                    indices, noeuds_max=NOEUDS_CREATEUR)
+                fltk.efface('message')
+                if nb_solutions is None:
+                    fltk.texte(250, 560, 'Grille trop difficile',
+                               couleur='red', ancrage='center', taille=14,
+                               tag='message')
+                elif nb_solutions == 1:
+                    numero = sauvegarde_grille(grille, {}, False, 0)
+                    fltk.texte(250, 560, nom_collection(numero) +
+                               ' sauvegardée',
+                               couleur='green', ancrage='center', taille=14)
+                    save = True
+                elif nb_solutions == 0:
+                    fltk.texte(250, 560, 'Aucune solution', couleur='red',
+                               ancrage='center', taille=14, tag='message')
+                else:
+                    fltk.texte(250, 560, 'Solution non unique',
+                               couleur='red', ancrage='center', taille=14,
+                               tag='message')
         elif tev == 'Quitte':
             break
 
 
 def sauvegarde_grille(grille, etat, temp, temps):
     """
-    Sauvegarde une grille dans le dossier "grilles"
+    Sauvegarde une grille : une nouvelle grille est ajoutée à la fin de la
+    collection du dossier "grilles", dont le numéro est retourné, une
+    partie en cours (temp) remplace la partie sauvegardée (FICHIER_PARTIE)
 
     :param grille: dict
+    :return value: int
     """
     if temp is False:
-        f = open('grilles/grille' + str(numero_grille()) + '.txt', 'w')
-    else:
-        f = open('grilles/reprendre-grille.txt', 'w')
-    for ligne in grille:
-        f.write(ligne)
-    f.close()
-    if temp is True:
-        f = open('grilles/reprendre-grille.txt', 'a')
-        f.write(str(etat))
-        f.write('\n'+str(temps))
-        f.close()
+        collection = Collection(FICHIER_COLLECTION)
+        try:
+            return collection.ajoute(grille)
+        finally:
+            collection.ferme()
+    partie.ecrit_partie(FICHIER_PARTIE, grille, etat,
+                        partie.secondes_temps(temps))
 
 
 def numero_grille():
     """
-    Retourne le numéro de la dernière grille + 1
+    Retourne le numéro que recevra la prochaine grille de la collection
 
     :return value: int
     """
-    n_grille = []
-    for grille in os.listdir('grilles'):
-        try:
-            n_grille.append(int(grille[6:].replace('.txt', '')))
-        except ValueError:
-            pass
-    return max(n_grille) + 1
+    if not os.path.exists(FICHIER_COLLECTION):
+        return 1
+    collection = Collection(FICHIER_COLLECTION)
+    try:
+        return len(collection) + 1
+    finally:
+        collection.ferme()
+
+
+def nom_collection(numero):
+    """
+    Retourne le nom sous lequel la grille numero de la collection est
+    proposée par le menu de sélection (et annoncée par le créateur)
+
+    :param numero: int
+    :return value: str
+
+    >>> nom_collection(3)
+    'Collection 3'
+    """
+    return 'Collection ' + str(numero)
+
+
+def grilles_dossier():
+    """
+    Retourne les grilles proposées par le menu de sélection avant celles de
+    la collection : la partie sauvegardée s'il y en a une, puis les fichiers
+    .txt du dossier "grilles" triés par trieLstGrille
+
+    :return value: list
+    """
+    grilles = liste_grilles('grilles')
+    if os.path.exists(FICHIER_PARTIE):
+        grilles.insert(0, NOM_PARTIE)
+    return trieLstGrille(grilles)
 
 
 def trieLstGrille(grilles):
@@ -911,8 +696,8 @@ def trieLstGrille(grilles):
     """
     grilleDict = {}
     dico = {}
-    if 'reprendre-grille.txt' in grilles:
-        dico.update({'reprendre-grille.txt': 0})
+    if NOM_PARTIE in grilles:
+        dico.update({NOM_PARTIE: 0})
     for grille in grilles:
         try:
             grilleDict[grille] = int(grille[6:].replace('.txt', ''))
@@ -926,9 +711,44 @@ def trieLstGrille(grilles):
     return lstGrille
 
 
+def entrees_selection(grilles, nombre, debut, places):
+    """
+    Retourne les entrées d'une page du menu de sélection : à partir de la
+    debut-ième, les grilles de la liste grilles puis les numéros 1 à nombre
+    des grilles de la collection, en au plus places entrées. Les entrées
+    '<' et '>' mènent aux pages précédente et suivante
+
+    :param grilles: list
+    :param nombre: int
+    :param debut: int
+    :param places: int
+    :return value: list
+
+    >>> entrees_selection(['grille1.txt'], 3, 0, 10)
+    ['grille1.txt', 1, 2, 3]
+    >>> entrees_selection(['grille1.txt'], 10, 0, 4)
+    ['grille1.txt', 1, 2, '>']
+    >>> entrees_selection(['grille1.txt'], 10, 3, 4)
+    ['<', 3, 4, '>']
+    """
+    total = len(grilles) + nombre
+    entrees = ['<'] if debut > 0 else []
+    places -= len(entrees)
+    if total - debut > places:
+        places -= 1
+    for k in range(debut, min(total, debut + places)):
+        entrees.append(grilles[k] if k < len(grilles)
+                       else k - len(grilles) + 1)
+    if total - debut > places:
+        entrees.append('>')
+    return entrees
+
+
 def affiche_selection_grille(grilles, hauteur):
     """
-    Affiche le menu de sélection des grilles
+    Affiche le menu de sélection des grilles : les noms de fichiers, les
+    numéros des grilles de la collection et les flèches de changement de
+    page (voir entrees_selection)
 
     :param grilles: list
     :param hauteur: int
@@ -938,63 +758,95 @@ def affiche_selection_grille(grilles, hauteur):
     x = 0
     n = 0
     for grille in grilles:
-        y = n * 50
-        if y >= hauteur:
-            x += 125
+        y = n * HAUTEUR_CHOIX
+        if y + HAUTEUR_CHOIX > hauteur:
+            x += LARGEUR_CHOIX
             n = 0
-            y = n * 50
-        elem[grille] = [x, y, x + 125, y + 50]
-        fltk.rectangle(x, y, x + 125, y + 50)
-        grille = grille.replace('.txt', '')
-        grille = grille.replace('-', ' ')
-        grille = grille.capitalize()
-        fltk.texte(x + 62.5, y + 25, grille, ancrage='center', taille=10)
+            y = n * HAUTEUR_CHOIX
+        elem[grille] = [x, y, x + LARGEUR_CHOIX, y + HAUTEUR_CHOIX]
+        fltk.rectangle(x, y, x + LARGEUR_CHOIX, y + HAUTEUR_CHOIX)
+        if grille == '<':
+            grille = 'Précédentes'
+        elif grille == '>':
+            grille = 'Suivantes'
+        elif isinstance(grille, int):
+            grille = nom_collection(grille)
+        else:
+            grille = grille.replace('.txt', '')
+            grille = grille.replace('-', ' ')
+            grille = grille.capitalize()
+        fltk.texte(x + LARGEUR_CHOIX / 2, y + HAUTEUR_CHOIX / 2, grille,
+                   ancrage='center', taille=10)
         n += 1
     return elem
 
 
-def selection_grille(hauteur, largeur, grilles):
+def selection_grille(hauteur, largeur, grilles, fichier_collection=None):
     """
-    Affiche et gère le menu de sélection des grilles
+    Affiche et gère le menu de sélection des grilles : celles de la liste
+    grilles (fichiers du dossier "grilles", ou dimensions du créateur), dans
+    l'ordre donné, puis celles de la collection fichier_collection si elle
+    existe, page par page. Seules les grilles de la page affichée sont lues
 
     :param hauteur: int
     :param largeur: int
     :param grilles: list
+    :param fichier_collection: str
     :return value: tuple
     """
-    fltk.rectangle(0, 0, largeur, hauteur,
-                   couleur='white', remplissage='white')
-    trieLstGrille(grilles)
-    grilles = trieLstGrille(grilles)
-    etat = {}
+    collection = None
+    if fichier_collection is not None and \
+            os.path.exists(fichier_collection):
+        collection = Collection(fichier_collection)
+    places = (hauteur // HAUTEUR_CHOIX) * (largeur // LARGEUR_CHOIX)
+    pages = [0]
+    etat = moteur.Etat()
     temps = [0, 0]
-    elem = affiche_selection_grille(grilles, hauteur)
-    while True:
-        ev = fltk.attend_ev()
-        tev = fltk.type_ev(ev)
-        if tev == 'ClicGauche':
-            x, y = fltk.abscisse(ev), fltk.ordonnee(ev)
-            for grille in elem:
-                if elem[grille][0] <= x <= elem[grille][2] and \
-                        elem[grille][1] <= y <= elem[grille][3]:
-                    if os.listdir('grilles')[0] in grilles:
-                        f = open('grilles/' + grille)
-                        grille = []
-                        for line in f.readlines():
-                            if line[:1] != '{' and line[:1] != '[':
-                                grille.append(line)
-                            elif line[:1] == '[':
-                                temps = ast.literal_eval(line)
-                            else:
-                                etat = ast.literal_eval(line)
-                        f.close()
-                    return grille, etat, temps
+    try:
+        while True:
+            nombre = len(collection) if collection is not None else 0
+            entrees = entrees_selection(grilles, nombre, pages[-1], places)
+            fltk.efface_tout()
+            fltk.rectangle(0, 0, largeur, hauteur,
+                           couleur='white', remplissage='white')
+            elem = affiche_selection_grille(entrees, hauteur)
+            choix = None
+            while choix is None:
+                ev = fltk.attend_ev()
+                tev = fltk.type_ev(ev)
+                if tev == 'ClicGauche':
+                    x, y = fltk.abscisse(ev), fltk.ordonnee(ev)
+                    for grille in elem:
+                        if elem[grille][0] <= x <= elem[grille][2] and \
+                                elem[grille][1] <= y <= elem[grille][3]:
+                            choix = grille
+            if choix == '<':
+                pages.pop()
+            elif choix == '>':
+                pages.append(pages[-1] + sum(entree not in ('<', '>')
+                                             for entree in entrees))
+            elif isinstance(choix, int):
+                return collection[choix], etat, temps
+            elif choix == NOM_PARTIE:
+                return partie.lit_partie(FICHIER_PARTIE)
+            else:
+                if choix.endswith('.txt'):
+                    f = open('grilles/' + choix)
+                    choix, etat, temps = moteur.lit_grille(f)
+                    f.close()
+                return choix, etat, temps
+    finally:
+        if collection is not None:
+            collection.ferme()
 
 
 def affiche_grille(grille, hauteur, largeur):
     """
     Affiche graphiquement la grille passée en paramètre et créer la liste des
-    indices
+    indices. La taille des cases est choisie pour que la grille, carrée ou
+    rectangulaire, tienne dans la zone de largeur x hauteur pixels. Retourne
+    la taille des cases, la marge, les indices et le Dessin qui met à jour
+    les indices et les segments
 
     :param grille: list
     :param hauteur: int
@@ -1004,101 +856,67 @@ def affiche_grille(grille, hauteur, largeur):
     fltk.rectangle(0, 0, largeur, hauteur+100,
                    couleur='white', remplissage='white')
     taille_marge = 25
-    taille_marge_const = taille_marge
-    taille_marge_y = taille_marge
-    taille_case = (largeur - 2*taille_marge) / len(grille)
-    rayon = 8
-    indices = []
-    for ligne in range(len(grille)):
-        taille_marge = taille_marge_const
-        if ligne < len(grille):
-            ligne_indices = []
-        for colonne in range(len(grille[0])):
-            if ligne < len(grille) and grille[ligne][colonne] != '_' and\
-                    grille[ligne][colonne] != '\n':
-                ligne_indices.append(grille[ligne][colonne])
-                fltk.texte(taille_marge + .5 * taille_case,
-                           taille_marge_y + .5 *
-                           taille_case, grille[ligne][colonne],
-                           ancrage='center')
-
-            elif ligne < len(grille) and grille[ligne][colonne] != '\n':
-                ligne_indices.append(None)
-            fltk.cercle(taille_marge, taille_marge_y,
+    indices = moteur.indices_grille(grille)
+    lignes, colonnes = len(indices), len(indices[0])
+    taille_case = min((largeur - 2*taille_marge) / colonnes,
+                      (hauteur - 2*taille_marge) / lignes)
+    rayon = min(8, taille_case / 8)
+    dessin = Dessin(moteur.geometrie_grille(lignes, colonnes), taille_marge,
+                    taille_case)
+    for ligne in range(lignes):
+        for colonne in range(colonnes):
+            dessin.indice(ligne, colonne, indices[ligne][colonne])
+    for ligne in range(lignes + 1):
+        for colonne in range(colonnes + 1):
+            fltk.cercle(taille_marge + colonne * taille_case,
+                        taille_marge + ligne * taille_case,
                         rayon, remplissage="black")
-            taille_marge += taille_case
-        taille_marge_y += taille_case
-        indices.append(ligne_indices)
-    taille_marge = taille_marge_const
-    for colonne in range(len(grille[0])):
-        fltk.cercle(taille_marge, taille_marge_y,
-                    rayon, remplissage="black")
-        taille_marge += taille_case
-    return taille_case, taille_marge_const, indices
+    return taille_case, taille_marge, indices, dessin
 
 
-def clic_dans_grille(x, y, marge, case, largeur, ep, etat, function, segment):
+def clic_dans_grille(x, y, dessin, etat, function):
     """
-    Gère les clics dans la grille dans le mode "jouer"
+    Gère les clics dans la grille dans le mode "jouer" : function est
+    appliquée au segment proche du clic s'il y en a un (x est l'ordonnée du
+    clic, y son abscisse). Retourne etat et le numéro du segment, ou None
 
     :param x: int
     :param y: int
-    :param marge: int
-    :param case: int
-    :param largeur: int
-    :param ep: int
+    :param dessin: Dessin
     :param etat: dict
     :param function: function
-    :param segment: tuple
     :return value: tuple
     """
-    i, j = pixel_vers_case(x, y, marge, case)
-    dx = (x - marge) / case
-    dy = (y - marge) / case
-    if (-0.2 < dx - round(dx) < 0.2) is True:
-        if dx - round(dx) < 0:
-            i += 1
-        a, b, c, d = coordonnees_segments(i, j, marge, case, 0, 1)
-        if d < largeur and b > 0:
-            segment = donne_segment([a, b, c, d], marge, case)
-            etat = function(etat, segment, [a, b, c, d], ep)
-    elif (-0.2 < dy - round(dy) < 0.2) is True:
-        if dy - round(dy) < 0:
-            j += 1
-        a, b, c, d = coordonnees_segments(i, j, marge, case, 1, 0)
-        if c < largeur and a > 0:
-            segment = donne_segment([a, b, c, d], marge, case)
-            etat = function(etat, segment, [a, b, c, d], ep)
-    return etat, segment
-
-
-def onclick(ev, clic, etat, marge, case, largeur, epaisseur, win):
+    numero = dessin.geometrie.segment_pixel(y, x, dessin.marge, dessin.case)
+    if numero is not None:
+        etat = function(etat, numero, dessin)
+    return etat, numero
+
+
+def onclick(ev, clic, etat, dessin, win):
     """
     Gère les clics dans le mode "jouer", appelle la fonction clic_dans_grille
-    si le clic est dans la grille
+    si le clic est dans la grille. Retourne etat et le numéro du segment
+    joué (None s'il n'y en a pas, False pour quitter)
 
     :param ev: tuple
     :param clic: int
     :param etat: dict
-    :param marge: int
-    :param case: int
-    :param largeur: int
-    :param epaisseur: int
+    :param dessin: Dessin
     :param win: bool
     :return value: bool
     """
     functions = [tracer_segment_graphique, interdire_segment_graphique]
     function = functions[clic]
-    segment = None
+    numero = None
     y, x = fltk.abscisse(ev), fltk.ordonnee(ev)
     if 340 <= y <= 490 and 535 <= x <= 585:
         return etat, False
     elif win is True and 10 <= y <= 165 and 535 <= x <= 585:
         affiche_etat_console(etat)
     elif x < 500:
-        etat, segment = clic_dans_grille(
-            x, y, marge, case, largeur, epaisseur, etat, function, segment)
-    return etat, segment
+        etat, numero = clic_dans_grille(x, y, dessin, etat, function)
+    return etat, numero
 
 
 def jouer(largeur, hauteur):
@@ -1109,41 +927,55 @@ def jouer(largeur, hauteur):
     :param hauteur: int
     """
     grille, etat, temps3 = selection_grille(
-        hauteur, largeur, os.listdir('grilles'))
-    taille_case, taille_marge, indices = affiche_grille(
-        grille, largeur, largeur)
-    epaisseur = 8
+        hauteur, largeur, grilles_dossier(), FICHIER_COLLECTION)
+    _, _, indices, dessin = affiche_grille(grille, largeur, largeur)
     temp = False
     if etat != {}:
-        afficher_etat(etat, taille_marge, taille_case, epaisseur)
+        afficher_etat(etat, dessin)
         temp = True
+    # Tient à jour les indices, les sommets et les composantes à chaque
+    # coup : la victoire est vérifiée en temps constant
+    etat = moteur.EtatJeu(indices, etat)
     bouton_quitter('Quitter')
-    segment = None
+    numero = None
     win = False
+    journal = None
     temps1 = donne_temps()
     while True:
         ev = fltk.attend_ev()
         tev = fltk.type_ev(ev)
         if tev == 'ClicGauche':
-            etat, segment = onclick(
-                ev, 0, etat, taille_marge, taille_case, largeur,
-                epaisseur, win)
+            etat, numero = onclick(ev, 0, etat, dessin, win)
         elif tev == 'ClicDroit':
-            etat, segment = onclick(
-                ev, 1, etat, taille_marge, taille_case, largeur,
-                epaisseur, win)
-        if tev == 'Quitte' or segment is False:
+            etat, numero = onclick(ev, 1, etat, dessin, win)
+        if tev == 'Quitte' or numero is False:
             if win is False:
-                sauvegarde_grille(grille, etat, True,
-                                  calcule_temps(temps1, donne_temps(),
-                                                temps3))
+                temps = calcule_temps(temps1, donne_temps(), temps3)
+                if journal is None:
+                    sauvegarde_grille(grille, etat, True, temps)
+                else:
+                    journal.ferme(etat, partie.secondes_temps(temps))
             break
-        if victoire(etat, indices, segment) is True:
+        if tev in ('ClicGauche', 'ClicDroit') and numero is not None \
+                and win is False:
+            # Chaque coup est sauvegardé aussitôt : la partie sauvegardée
+            # n'est remplacée qu'au premier coup joué
+            secondes = partie.secondes_temps(
+                calcule_temps(temps1, donne_temps(), temps3))
+            if journal is None:
+                journal = partie.Journal(FICHIER_PARTIE, grille, etat,
+                                         secondes)
+            else:
+                journal.note(etat, numero, secondes)
+        if numero is not None and etat.gagne():
             affiche_victoire('Victoire !', 'green')
             win = True
             affiche_temps(calcule_temps(temps1, donne_temps(), temps3))
-            if temp is True:
-                efface_grille('reprendre-grille.txt')
+            if journal is not None:
+                journal.efface()
+                journal = None
+            elif temp is True:
+                partie.efface_partie(FICHIER_PARTIE)
 
 
 def affiche_menu(largeur, hauteur):